@@ -1,15 +1,213 @@
 DOMAIN = 'neore'
 
+import asyncio
 import logging
-from homeassistant.const import CONF_USERNAME, CONF_PASSWORD, CONF_HOST
-from homeassistant.core import HomeAssistant
+from datetime import timedelta
+import voluptuous as vol
+from homeassistant.const import CONF_USERNAME, CONF_PASSWORD, CONF_HOST, CONF_NAME, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity_platform import async_get_platforms
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.reload import async_integration_yaml_config
 from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import slugify
+from .archive import ARCHIVE_PAGES, SnapshotArchive
+from .authentication import create_session
 from .plc_data_manager import NeoreDataManager
+from .coordinator import ARCHIVE_FLUSH_INTERVAL, NeoreCoordinator
+from .deadband import DEFAULT_HEARTBEAT, Deadband
+from .scheduler import MIN_POLL_INTERVAL
 
 _LOGGER = logging.getLogger(__name__)
 
+# Sensors for the readings, numbers for the setpoints that can be written
+PLATFORMS = ("sensor", "number")
+
+CONF_SCAN_INTERVALS = "scan_intervals"
+CONF_DEADBANDS = "deadbands"
+CONF_HEARTBEAT = "heartbeat"
+CONF_DEVICES = "devices"
+CONF_MAX_CONCURRENT_POLLS = "max_concurrent_polls"
+CONF_DISCOVER = "discover"
+CONF_ARCHIVE = "archive"
+CONF_STATISTICS = "statistics"
+CONF_PAGES = "pages"
+CONF_PATH = "path"
+CONF_RETENTION_DAYS = "retention_days"
+
+SERVICE_DIAGNOSTICS = "diagnostics"
+SERVICE_REFRESH = "refresh"
+SERVICE_RELOAD = "reload"
+ATTR_DEVICE = "device"
+ATTR_PAGE = "page"
+
+REFRESH_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_DEVICE): cv.string,
+    vol.Optional(ATTR_PAGE): cv.string,
+})
+
+# Options that can be set per device or once for all devices
+DEVICE_OPTIONS = (
+    CONF_SCAN_INTERVALS, CONF_DEADBANDS, CONF_HEARTBEAT, CONF_DISCOVER, CONF_ARCHIVE, CONF_STATISTICS,
+)
+
+
+def _deadband(value):
+    """Validate a deadband, a number or a percentage like "2%"; it is parsed by the coordinator."""
+    try:
+        Deadband.parse(value)
+    except (TypeError, ValueError) as err:
+        raise vol.Invalid(f"invalid deadband {value!r}, expected a number or a percentage") from err
+    return value
+
+
+def _has_credentials(config):
+    """Require the credentials at the top level when no devices are listed."""
+    if CONF_DEVICES not in config:
+        for key in (CONF_USERNAME, CONF_PASSWORD):
+            if key not in config:
+                raise vol.Invalid("required key not provided", path=[key])
+    return config
+
+
+ARCHIVE_SCHEMA = vol.Schema({
+    vol.Optional(CONF_PAGES): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(CONF_PATH): cv.string,
+    vol.Optional(CONF_RETENTION_DAYS): cv.positive_int,
+})
+
+DEVICE_OPTIONS_SCHEMA = {
+    # Poll interval in seconds by page, e.g. {"PAGE70.XML": 10}
+    vol.Optional(CONF_SCAN_INTERVALS): {
+        cv.string: vol.All(vol.Coerce(float), vol.Range(min=MIN_POLL_INTERVAL)),
+    },
+    # Deadband by sensor unique ID, e.g. {"neore_cop": "2%"}
+    vol.Optional(CONF_DEADBANDS): {cv.string: _deadband},
+    # Minutes; zero would write every poll and defeat the deadbands
+    vol.Optional(CONF_HEARTBEAT): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(CONF_DISCOVER): cv.boolean,
+    vol.Optional(CONF_ARCHIVE): vol.Any(cv.boolean, ARCHIVE_SCHEMA),
+    vol.Optional(CONF_STATISTICS): cv.boolean,
+}
+
+DEVICE_SCHEMA = vol.Schema({
+    vol.Optional(CONF_HOST): cv.string,
+    vol.Required(CONF_USERNAME): cv.string,
+    vol.Required(CONF_PASSWORD): cv.string,
+    vol.Optional(CONF_NAME): cv.string,
+    **DEVICE_OPTIONS_SCHEMA,
+})
+
+# A single heat pump at the top level, or a list of devices
+CONFIG_SCHEMA = vol.Schema({
+    DOMAIN: vol.All(
+        vol.Schema({
+            vol.Optional(CONF_HOST): cv.string,
+            vol.Optional(CONF_USERNAME): cv.string,
+            vol.Optional(CONF_PASSWORD): cv.string,
+            vol.Optional(CONF_NAME): cv.string,
+            vol.Optional(CONF_DEVICES): vol.All(cv.ensure_list, [DEVICE_SCHEMA]),
+            vol.Optional(CONF_MAX_CONCURRENT_POLLS): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            **DEVICE_OPTIONS_SCHEMA,
+        }),
+        _has_credentials,
+    ),
+}, extra=vol.ALLOW_EXTRA)
+
 # Default values
 DEFAULT_URL = "http://192.168.0.152/"
+DEFAULT_NAME = "Neore"
+DEFAULT_MAX_CONCURRENT_POLLS = 4
+DEFAULT_ARCHIVE_PATH = "neore_archive"
+
+
+def _create_archive(hass, archive_config, device_id):
+    """Create the snapshot archive of a device, or None if it is not enabled.
+
+    ``archive: true`` archives PAGE70.XML under <config>/neore_archive/<device>;
+    a mapping can set ``pages``, ``path`` and ``retention_days``.
+    """
+    if not archive_config:
+        return None
+    if not isinstance(archive_config, dict):
+        archive_config = {}
+    return SnapshotArchive(
+        hass.config.path(archive_config.get(CONF_PATH, DEFAULT_ARCHIVE_PATH), device_id),
+        archive_config.get(CONF_PAGES, ARCHIVE_PAGES),
+        archive_config.get(CONF_RETENTION_DAYS),
+    )
+
+
+async def _async_create_coordinator(hass, device_config, poll_semaphore, legacy):
+    """Create the session, data manager and coordinator of one heat pump."""
+    host = device_config.get(CONF_HOST, DEFAULT_URL)
+    name = device_config.get(CONF_NAME, DEFAULT_NAME if legacy else host)
+    unique_id_prefix = DOMAIN if legacy else f"{DOMAIN}_{slugify(name)}"
+    username = device_config[CONF_USERNAME]
+    password = device_config[CONF_PASSWORD]
+    _LOGGER.info("Creating Neore data manager for %s", host)
+
+    # Dedicated keep-alive session so the PLC connection and its cookie
+    # survive between poll cycles
+    session = create_session()
+    try:
+        data_manager = NeoreDataManager(
+            session,
+            host,
+            username,
+            password,
+            # Optional per-page poll intervals in seconds, e.g. {"PAGE70.XML": 10}
+            device_config.get(CONF_SCAN_INTERVALS),
+            # Optional full-resolution archive of every register on some pages
+            _create_archive(hass, device_config.get(CONF_ARCHIVE), unique_id_prefix),
+        )
+        # Pages are fetched as soon as the first entity subscribes to them
+        coordinator = NeoreCoordinator(
+            hass,
+            data_manager,
+            name,
+            unique_id_prefix,
+            poll_semaphore,
+            # Optional deadbands by sensor unique ID, e.g. {"neore_cop": "2%"}
+            device_config.get(CONF_DEADBANDS),
+            # Longest time in minutes between state writes of an unchanged sensor
+            device_config.get(CONF_HEARTBEAT, DEFAULT_HEARTBEAT // 60) * 60,
+            # Also create disabled sensors for the registers without a table entry
+            device_config.get(CONF_DISCOVER, False),
+        )
+    except BaseException:
+        # Nothing owns the session yet
+        await session.close()
+        raise
+    # Closed last, once fetches in flight are cancelled
+    coordinator.async_on_shutdown(session.close)
+
+    try:
+        await _async_start_coordinator(hass, coordinator, device_config)
+    except BaseException:
+        await coordinator.async_shutdown()
+        raise
+    return coordinator
+
+
+async def _async_start_coordinator(hass, coordinator, device_config):
+    """Restore the state of a new coordinator and start its archive and statistics."""
+    if coordinator.data_manager.archive is not None:
+        # Archived snapshots are written in batches in the executor
+        coordinator.async_on_shutdown(async_track_time_interval(
+            hass, coordinator.async_flush_archive, timedelta(seconds=ARCHIVE_FLUSH_INTERVAL)
+        ))
+
+    await coordinator.async_restore_energy()
+    if device_config.get(CONF_STATISTICS, False):
+        # Hourly statistics imported directly, so the sensors can be excluded from the recorder
+        coordinator.async_enable_statistics()
+    if await coordinator.async_restore_snapshot():
+        # The restored pages are known, so fetch them while the platform is set up
+        hass.async_create_task(coordinator.async_refresh())
+
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Neore component."""
@@ -18,35 +216,129 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     if DOMAIN not in config:
         _LOGGER.warning("Neore not configured in configuration.yaml")
         return True
-    
-    _LOGGER.info("Creating Neore data manager")
-    data_manager = NeoreDataManager(
-        config[DOMAIN].get(CONF_HOST, DEFAULT_URL),
-        config[DOMAIN][CONF_USERNAME],
-        config[DOMAIN][CONF_PASSWORD]
+
+    await _async_setup_devices(hass, config)
+
+    async def _async_diagnostics(call: ServiceCall) -> ServiceResponse:
+        """Return poll timings, latency histograms and error counts per heat pump."""
+        return {device_id: coordinator.diagnostics() for device_id, coordinator in hass.data[DOMAIN].items()}
+
+    async def _async_refresh(call: ServiceCall) -> None:
+        """Poll the PLC pages right away, on one device or all of them."""
+        device = call.data.get(ATTR_DEVICE)
+        targets = [
+            coordinator for coordinator in hass.data[DOMAIN].values()
+            if device is None or device in (coordinator.device_id, coordinator.device_name)
+        ]
+        if not targets:
+            raise HomeAssistantError(f"No Neore device named {device}")
+        pages = [call.data[ATTR_PAGE]] if ATTR_PAGE in call.data else None
+        refreshed = await asyncio.gather(*(coordinator.async_refresh_pages(pages) for coordinator in targets))
+        if not any(refreshed):
+            reason = f"{pages[0]} is not polled" if pages else "no pages are polled yet"
+            raise HomeAssistantError(f"Nothing to refresh: {reason}")
+
+    reload_lock = asyncio.Lock()
+
+    async def _async_reload(call: ServiceCall) -> None:
+        """Tear everything down and set it up again from configuration.yaml."""
+        new_config = await async_integration_yaml_config(hass, DOMAIN)
+        if new_config is None:
+            raise HomeAssistantError("Could not load the Neore configuration, keeping the current one")
+        async with reload_lock:
+            await _async_unload_devices(hass)
+            if DOMAIN in new_config:
+                await _async_setup_devices(hass, new_config)
+
+    async def _async_stop(event):
+        # Entities stay; their states are wanted in the recorder until the end
+        await asyncio.gather(*(coordinator.async_shutdown() for coordinator in hass.data[DOMAIN].values()))
+
+    hass.services.async_register(DOMAIN, SERVICE_REFRESH, _async_refresh, schema=REFRESH_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_RELOAD, _async_reload)
+
+    # YAML setups have no config entry, so no diagnostics download; a
+    # service with a response serves the same purpose
+    hass.services.async_register(
+        DOMAIN, SERVICE_DIAGNOSTICS, _async_diagnostics, supports_response=SupportsResponse.ONLY
     )
 
-    # Store data manager in hass.data for use in platform setup
-    hass.data[DOMAIN] = data_manager
+    # Cancel fetches in flight and write what is pending before Home Assistant exits
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
+    return True
+
+
+async def _async_setup_devices(hass: HomeAssistant, config: ConfigType):
+    """Create the coordinators of the configured heat pumps and load the platforms."""
+    domain_config = config[DOMAIN]
+    devices = domain_config.get(CONF_DEVICES)
+    # A single heat pump configured at the top level keeps its original
+    # unprefixed unique IDs; listed devices are namespaced by their name
+    legacy = devices is None
+    if legacy:
+        devices = [domain_config]
+
+    # Bounds how many PLCs are fetched at the same time; each device still
+    # polls on its own schedule so a slow one never delays the others
+    poll_semaphore = asyncio.Semaphore(
+        domain_config.get(CONF_MAX_CONCURRENT_POLLS, DEFAULT_MAX_CONCURRENT_POLLS)
+    )
+
+    coordinators = {}
+    for device_config in devices:
+        # Options not given per device fall back to the top level
+        device_config = {
+            **{key: domain_config[key] for key in DEVICE_OPTIONS if key in domain_config},
+            **device_config,
+        }
+        try:
+            coordinator = await _async_create_coordinator(hass, device_config, poll_semaphore, legacy)
+        except BaseException:
+            # Shut down the devices created so far, so none leaks its session
+            await asyncio.gather(*(created.async_shutdown() for created in coordinators.values()))
+            raise
+        if coordinator.device_id in coordinators:
+            _LOGGER.error(
+                "Neore device %s is configured more than once, give every device a unique name",
+                coordinator.device_name,
+            )
+            await coordinator.async_shutdown()
+            continue
+        coordinators[coordinator.device_id] = coordinator
+
+    # Store coordinators in hass.data for use in platform setup
+    hass.data[DOMAIN] = coordinators
     
-    _LOGGER.info("Neore data manager stored, loading sensor platform")
+    _LOGGER.info("%d Neore coordinator(s) stored, loading platforms", len(coordinators))
 
-    # Load sensor platform
+    # Load the platforms
     # Import here to avoid circular imports
     from homeassistant.helpers import discovery
     
-    # Load the platform - await it to ensure proper error handling
-    try:
-        await discovery.async_load_platform(hass, 'sensor', DOMAIN, {}, config)
-        _LOGGER.info("Neore sensor platform loaded successfully")
-    except Exception as e:
-        _LOGGER.error(
-            "Failed to load Neore sensor platform: %s. "
-            "Check your configuration and restart Home Assistant. "
-            "If the issue persists, check that the sensor component is properly loaded.",
-            e, 
-            exc_info=True
-        )
-        # Don't fail setup if sensor platform fails
-    
-    return True
+    # Load each platform - await it to ensure proper error handling
+    for platform in PLATFORMS:
+        try:
+            await discovery.async_load_platform(hass, platform, DOMAIN, {}, config)
+            _LOGGER.info("Neore %s platform loaded successfully", platform)
+        except Exception as e:
+            _LOGGER.error(
+                "Failed to load Neore %s platform: %s. "
+                "Check your configuration and restart Home Assistant. "
+                "If the issue persists, check that the %s component is properly loaded.",
+                platform,
+                e, 
+                platform,
+                exc_info=True
+            )
+            # Don't fail setup if a platform fails
+
+
+async def _async_unload_devices(hass: HomeAssistant):
+    """Remove the entities and shut down the coordinators, for reload or shutdown."""
+    coordinators = hass.data.get(DOMAIN, {})
+    hass.data[DOMAIN] = {}
+    # Entities go first, so they drop their subscriptions before polling stops
+    for platform in async_get_platforms(hass, DOMAIN):
+        await platform.async_reset()
+    await asyncio.gather(*(coordinator.async_shutdown() for coordinator in coordinators.values()))
+    _LOGGER.info("Unloaded %d Neore coordinator(s)", len(coordinators))
@@ -0,0 +1,318 @@
+"""Append-only archive of the raw registers of a page, for offline analysis.
+
+Every parse of an archived page appends one record with the typed value of
+every register on it, not just the ones entities use. Records are kept in
+memory and written in batches by ``flush()``, which does blocking file I/O
+and is meant to run in an executor.
+
+Files are rotated per UTC day and per run: ``YYYY-MM-DD.NNN.nsa.gz``. Each
+batch is appended as its own gzip member, so a file is a valid gzip stream
+at every batch boundary. Inside, a file is a sequence of binary records:
+
+- ``N`` defines a register name: id (uint16), length (uint16), UTF-8 name
+- ``R`` holds a snapshot: time (float64), count (uint16), then per value
+  id (uint16), type tag (uint8) and the value
+
+A snapshot record only carries the values that changed since the previous
+record of the same file; the first one of a file carries them all. Read an
+archive back with ``read_archive()``, or from the command line::
+
+    python -m custom_components.neore.archive /config/neore_archive/neore --start 2026-10-01
+"""
+import argparse
+import datetime
+import gzip
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+
+_LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_PAGES = ('PAGE70.XML',)
+FILE_SUFFIX = '.nsa.gz'
+MAGIC = b'NSA1'
+# Snapshots kept in memory while writing fails, e.g. on a full disk; the
+# oldest are dropped beyond that
+MAX_PENDING = 10000
+
+_NAME = struct.Struct('<HH')
+_RECORD = struct.Struct('<dH')
+_FLOAT = struct.Struct('<d')
+_INT = struct.Struct('<q')
+_UINT16 = struct.Struct('<H')
+
+# Type tags of the values
+TAG_NONE, TAG_FLOAT, TAG_INT, TAG_TRUE, TAG_FALSE, TAG_STR, TAG_BIGINT = range(7)
+INT64_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _encode_value(value):
+    if value is None:
+        return bytes((TAG_NONE,))
+    if value is True or value is False:
+        return bytes((TAG_TRUE if value else TAG_FALSE,))
+    if isinstance(value, float):
+        return bytes((TAG_FLOAT,)) + _FLOAT.pack(value)
+    if isinstance(value, int):
+        if value in INT64_RANGE:
+            return bytes((TAG_INT,)) + _INT.pack(value)
+        value, tag = str(value), TAG_BIGINT
+    else:
+        value, tag = str(value), TAG_STR
+    data = value.encode('utf-8')
+    return bytes((tag,)) + _UINT16.pack(len(data)) + data
+
+
+def _file_day(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).date()
+
+
+def _parse_file_name(file_name):
+    """Return ``(day, part)`` of an archive file name, or None for other files."""
+    if not file_name.endswith(FILE_SUFFIX):
+        return None
+    try:
+        day, part = file_name[:-len(FILE_SUFFIX)].split('.')
+        return datetime.date.fromisoformat(day), int(part)
+    except ValueError:
+        return None
+
+
+def archive_files(directory):
+    """Return ``[(day, path)]`` of the archive files in a directory, oldest first."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    files = []
+    for file_name in names:
+        key = _parse_file_name(file_name)
+        if key is not None:
+            files.append((key, os.path.join(directory, file_name)))
+    return [(key[0], path) for key, path in sorted(files)]
+
+
+class SnapshotArchive:
+    """Buffer the raw snapshots of the archived pages and write them to disk.
+
+    ``append()`` only stores a reference and is safe to call on the event
+    loop. ``flush()`` encodes and writes everything appended so far; it
+    blocks, and concurrent calls are serialised. ``retention_days`` deletes
+    files older than that many days when a new file is started.
+    """
+
+    def __init__(self, directory, pages=ARCHIVE_PAGES, retention_days=None):
+        self.directory = directory
+        self.pages = frozenset(pages)
+        self.retention_days = retention_days
+        self._pending = deque(maxlen=MAX_PENDING)
+        self._write_lock = threading.Lock()
+        # State of the file being written; a new run always starts a new file
+        self._day = None
+        self._path = None
+        self._names = {}  # register name -> id in the current file
+        self._last = {}  # register name -> last value written to the current file
+        self.records_written = 0
+        self.bytes_written = 0
+
+    @property
+    def pending(self):
+        """Return the number of snapshots not written yet."""
+        return len(self._pending)
+
+    def append(self, timestamp, values):
+        """Queue the ``{register name: typed value}`` of a page read at ``timestamp``."""
+        self._pending.append((timestamp, values))
+
+    def flush(self):
+        """Write the queued snapshots; blocking, run it in an executor."""
+        with self._write_lock:
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except OSError:
+                # Keep them for the next flush, ahead of anything newer, and
+                # start over in a new file that does not depend on this one
+                self._pending.extendleft(reversed(batch))
+                self._day = None
+                raise
+            return len(batch)
+
+    def _write(self, batch):
+        chunks = []
+        for timestamp, values in batch:
+            day = _file_day(timestamp)
+            if day != self._day:
+                self._write_chunks(chunks)
+                chunks = []
+                self._start_file(day)
+            chunks.append(self._encode(timestamp, values))
+        self._write_chunks(chunks)
+
+    def _write_chunks(self, chunks):
+        if not chunks:
+            return
+        data = gzip.compress(b''.join(chunks), compresslevel=6)
+        with open(self._path, 'ab') as file:
+            file.write(data)
+        self.records_written += len(chunks)
+        self.bytes_written += len(data)
+
+    def _start_file(self, day):
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = day.isoformat()
+        parts = [
+            key[1] for key in map(_parse_file_name, os.listdir(self.directory))
+            if key is not None and key[0] == day
+        ]
+        self._day = day
+        self._path = os.path.join(self.directory, f"{prefix}.{max(parts, default=0) + 1:03d}{FILE_SUFFIX}")
+        self._names = {}
+        self._last = {}
+        _LOGGER.debug("Archiving to %s", self._path)
+        # The magic goes into the first gzip member of the file
+        with open(self._path, 'ab') as file:
+            file.write(gzip.compress(MAGIC))
+        self._apply_retention(day)
+
+    def _apply_retention(self, today):
+        if not self.retention_days:
+            return
+        oldest = today - datetime.timedelta(days=self.retention_days)
+        for day, path in archive_files(self.directory):
+            if day >= oldest:
+                break
+            _LOGGER.debug("Removing archive file %s past retention", path)
+            os.remove(path)
+
+    def _encode(self, timestamp, values):
+        parts = []
+        changed = []
+        for name, value in values.items():
+            if name in self._last and self._last[name] == value:
+                continue
+            self._last[name] = value
+            name_id = self._names.get(name)
+            if name_id is None:
+                name_id = self._names[name] = len(self._names)
+                data = name.encode('utf-8')
+                parts.append(b'N' + _NAME.pack(name_id, len(data)) + data)
+            changed.append(_UINT16.pack(name_id) + _encode_value(value))
+        parts.append(b'R' + _RECORD.pack(timestamp, len(changed)))
+        parts.extend(changed)
+        return b''.join(parts)
+
+
+class _Reader:
+    """Read exactly sized pieces from a stream, raising EOFError at its end."""
+
+    __slots__ = ('_file',)
+
+    def __init__(self, file):
+        self._file = file
+
+    def read(self, size):
+        data = self._file.read(size)
+        if len(data) != size:
+            raise EOFError
+        return data
+
+    def unpack(self, layout):
+        return layout.unpack(self.read(layout.size))
+
+
+def _decode_value(reader):
+    tag = reader.read(1)[0]
+    if tag == TAG_NONE:
+        return None
+    if tag == TAG_FLOAT:
+        return reader.unpack(_FLOAT)[0]
+    if tag == TAG_INT:
+        return reader.unpack(_INT)[0]
+    if tag in (TAG_TRUE, TAG_FALSE):
+        return tag == TAG_TRUE
+    (length,) = reader.unpack(_UINT16)
+    text = reader.read(length).decode('utf-8')
+    return int(text) if tag == TAG_BIGINT else text
+
+
+def read_file(path, start=None, end=None):
+    """Yield ``(timestamp, {register name: value})`` of one archive file.
+
+    The values are the full state at that time, rebuilt from the changes
+    stored in the file. The file is streamed, and reading stops at the
+    first record after ``end``. A file cut off by a crash ends early.
+    """
+    names = {}
+    state = {}
+    with gzip.open(path, 'rb') as file:
+        reader = _Reader(file)
+        try:
+            if reader.read(len(MAGIC)) != MAGIC:
+                _LOGGER.warning("%s is not a snapshot archive", path)
+                return
+            while True:
+                kind = reader.read(1)
+                if kind == b'N':
+                    name_id, length = reader.unpack(_NAME)
+                    names[name_id] = reader.read(length).decode('utf-8')
+                elif kind == b'R':
+                    timestamp, count = reader.unpack(_RECORD)
+                    for _ in range(count):
+                        (name_id,) = reader.unpack(_UINT16)
+                        state[names[name_id]] = _decode_value(reader)
+                    if end is not None and timestamp > end:
+                        return
+                    if start is None or timestamp >= start:
+                        yield timestamp, dict(state)
+                else:
+                    raise ValueError(f"unknown record type {kind!r}")
+        except (EOFError, zlib.error, gzip.BadGzipFile, ValueError, KeyError) as e:
+            if not isinstance(e, EOFError):
+                _LOGGER.warning("Archive file %s is damaged, stopped reading it: %r", path, e)
+
+
+def read_archive(directory, start=None, end=None):
+    """Yield ``(timestamp, {register name: value})`` of a time range, oldest first.
+
+    ``start`` and ``end`` are Unix timestamps and either may be None. Only
+    the files of the days in range are opened, one at a time.
+    """
+    first_day = None if start is None else _file_day(start)
+    last_day = None if end is None else _file_day(end)
+    for day, path in archive_files(directory):
+        if first_day is not None and day < first_day:
+            continue
+        if last_day is not None and day > last_day:
+            break
+        yield from read_file(path, start, end)
+
+
+def _timestamp(text):
+    moment = datetime.datetime.fromisoformat(text)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print a Neore snapshot archive as JSON lines")
+    parser.add_argument("directory", help="archive directory of one heat pump")
+    parser.add_argument("--start", type=_timestamp, help="ISO date or time, UTC unless given")
+    parser.add_argument("--end", type=_timestamp, help="ISO date or time, UTC unless given")
+    args = parser.parse_args(argv)
+
+    for timestamp, values in read_archive(args.directory, args.start, args.end):
+        print(json.dumps({"time": timestamp, **values}))
+
+
+if __name__ == "__main__":
+    main()
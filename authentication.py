@@ -1,102 +1,303 @@
+import asyncio
 import logging
 import hashlib
-import requests
+import struct
+import time
+import aiohttp
+from .metrics import PollMetrics
 
 _LOGGER = logging.getLogger(__name__)
 
-class NeoreSessionManager:
-    _instance = None
+# SoftPLC drops idle sessions after a while; re-login slightly before that
+COOKIE_LIFETIME = 600
+# Keep pooled connections open across poll cycles
+KEEPALIVE_TIMEOUT = 120
+# A hung PLC must never stall a poll cycle
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+REQUEST_TIMEOUT = 20
+# Status codes the PLC answers with when the session cookie is no longer valid
+REJECTED_STATUSES = (401, 403)
 
-    def __new__(cls, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super(NeoreSessionManager, cls).__new__(cls)
-            cls._instance.cookie = None
-        return cls._instance
 
-    def __init__(self, url, username, password):
-        self.url = url
-        self.username = username
-        self.password = password
+# Digests SoftPLC expects, used to verify a backend before it is trusted.
+# The strings are hashed as latin-1, exactly like the PLC's login page does.
+SHA1_KNOWN_ANSWERS = (
+    ("", "da39a3ee5e6b4b0d3255bfef95601890afd80709"),
+    ("abc", "a9993e364706816aba3e25717850c26c9cd0d89d"),
+    # Two-block message: padding spills into a second 64-byte block
+    ("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq", "84983e441c3bd26ebaae4aa1f95129e5e54670f1"),
+    # SoftPLC challenge cookie followed by the password
+    ("4F3A9C21E07B5D18secret", "53c709a29b359e8cac1a71bb939a209edcc7954d"),
+    ("A1B2C3D4E5F60718passwörd", "e9ab1425661349d436490d527d7b34c755ea9546"),
+)
 
-    def left_rotate(self, n, b):
-        return ((n << b) | (n >> (32 - b))) & 0xffffffff
 
-    def f(self, s, x, y, z):
-        if s == 0:
-            return (x & y) ^ (~x & z) & 0xffffffff
-        elif s == 1:
-            return x ^ y ^ z
-        elif s == 2:
-            return (x & y) ^ (x & z) ^ (y & z)
-        elif s == 3:
-            return x ^ y ^ z
+def _sha1_hashlib(input_string):
+    return hashlib.sha1(input_string.encode('latin1')).hexdigest()
 
-    def to_hex_str(self, val):
-        return ''.join(f"{(val >> (i * 4)) & 0xf:x}" for i in range(7, -1, -1))
 
-    def sha1_hash(self, input_string):
-        K = [0x5a827999, 0x6ed9eba1, 0x8f1bbcdc, 0xca62c1d6]
+def _sha1_python(input_string):
+    """Pure-Python SHA-1, kept as a fallback for builds without hashlib.sha1."""
+    message = bytearray(input_string, 'latin1')
+    original_bit_len = len(message) * 8
+    message.append(0x80)
+    message.extend(b'\x00' * ((56 - len(message)) % 64))
+    message += original_bit_len.to_bytes(8, byteorder='big')
 
-        # Ensure input_string is a bytearray
-        input_string = bytearray(input_string, 'latin1')
-        original_byte_len = len(input_string)
-        input_string.append(0x80)
+    h0, h1, h2, h3, h4 = 0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476, 0xc3d2e1f0
 
-        while len(input_string) % 64 != 56:
-            input_string.append(0)
+    for i in range(0, len(message), 64):
+        w = list(struct.unpack('>16I', message[i:i + 64]))
+        for j in range(16, 80):
+            x = w[j - 3] ^ w[j - 8] ^ w[j - 14] ^ w[j - 16]
+            w.append(((x << 1) | (x >> 31)) & 0xffffffff)
 
-        original_bit_len = original_byte_len * 8
-        input_string += original_bit_len.to_bytes(8, byteorder='big')
+        a, b, c, d, e = h0, h1, h2, h3, h4
 
-        h0, h1, h2, h3, h4 = 0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476, 0xc3d2e1f0
+        # The round function is inlined per 20-round stage to avoid a call per round
+        for j in range(0, 20):
+            temp = ((((a << 5) | (a >> 27)) & 0xffffffff) + ((b & c) | (~b & d)) + e + 0x5a827999 + w[j]) & 0xffffffff
+            e, d, c, b, a = d, c, ((b << 30) | (b >> 2)) & 0xffffffff, a, temp
+        for j in range(20, 40):
+            temp = ((((a << 5) | (a >> 27)) & 0xffffffff) + (b ^ c ^ d) + e + 0x6ed9eba1 + w[j]) & 0xffffffff
+            e, d, c, b, a = d, c, ((b << 30) | (b >> 2)) & 0xffffffff, a, temp
+        for j in range(40, 60):
+            temp = ((((a << 5) | (a >> 27)) & 0xffffffff) + ((b & c) | (b & d) | (c & d)) + e + 0x8f1bbcdc + w[j]) & 0xffffffff
+            e, d, c, b, a = d, c, ((b << 30) | (b >> 2)) & 0xffffffff, a, temp
+        for j in range(60, 80):
+            temp = ((((a << 5) | (a >> 27)) & 0xffffffff) + (b ^ c ^ d) + e + 0xca62c1d6 + w[j]) & 0xffffffff
+            e, d, c, b, a = d, c, ((b << 30) | (b >> 2)) & 0xffffffff, a, temp
 
-        for i in range(0, len(input_string), 64):
-            w = [int.from_bytes(input_string[i+j:i+j+4], 'big') for j in range(0, 64, 4)]
-            for j in range(16, 80):
-                w.append(self.left_rotate(w[j-3] ^ w[j-8] ^ w[j-14] ^ w[j-16], 1))
+        h0 = (h0 + a) & 0xffffffff
+        h1 = (h1 + b) & 0xffffffff
+        h2 = (h2 + c) & 0xffffffff
+        h3 = (h3 + d) & 0xffffffff
+        h4 = (h4 + e) & 0xffffffff
 
-            a, b, c, d, e = h0, h1, h2, h3, h4
+    return '%08x%08x%08x%08x%08x' % (h0, h1, h2, h3, h4)
 
-            for j in range(80):
-                temp = (self.left_rotate(a, 5) + self.f(j // 20, b, c, d) + e + K[j // 20] + w[j]) & 0xffffffff
-                e, d, c, b, a = d, c, self.left_rotate(b, 30), a, temp
 
-            h0, h1, h2, h3, h4 = (h0 + a) & 0xffffffff, (h1 + b) & 0xffffffff, (h2 + c) & 0xffffffff, (h3 + d) & 0xffffffff, (h4 + e) & 0xffffffff
+SHA1_BACKENDS = {
+    'hashlib': _sha1_hashlib,
+    'python': _sha1_python,
+}
 
-        return self.to_hex_str(h0) + self.to_hex_str(h1) + self.to_hex_str(h2) + self.to_hex_str(h3) + self.to_hex_str(h4)
 
-    def login(self):
-        if not self.cookie:
-            # Step 1: Make a GET request to retrieve the SoftPLC cookie
-            try:
-                get_response = requests.get(f"{self.url}LOGIN.XML", verify=False)
-                softplc_cookie = get_response.cookies['SoftPLC']
-            except requests.RequestException as e:
-                _LOGGER.error(f"Error during GET request for cookie: {e}")
-                return None
+def verify_sha1_backend(backend):
+    """Return True if the backend reproduces every known answer."""
+    try:
+        return all(backend(message) == digest for message, digest in SHA1_KNOWN_ANSWERS)
+    except (ValueError, UnicodeEncodeError):
+        return False
 
-            # Step 2: Use the SoftPLC cookie value in the hash
-            payload_hash = self.sha1_hash(softplc_cookie + self.password)
 
-            # Step 3: Make the POST request with the updated payload
-            payload = {
-                'USER': self.username,
-                'PASS': payload_hash
-            }
+def select_sha1_backend(preferred='hashlib'):
+    """Return the name of the first backend that passes the known answers."""
+    for name in (preferred, *SHA1_BACKENDS):
+        if name in SHA1_BACKENDS and verify_sha1_backend(SHA1_BACKENDS[name]):
+            return name
+    raise RuntimeError("No SHA-1 backend produces the digests SoftPLC expects")
 
-            try:
-                post_response = requests.post(f"{self.url}LOGIN.XML", data=payload, verify=False, cookies={'SoftPLC': softplc_cookie})
-                _LOGGER.warning(f"Login: {post_response.status_code}, Response: {post_response.text}")
-                if post_response.status_code == 200 and 'SoftPLC' in post_response.cookies:
-                    self.cookie = post_response.cookies['SoftPLC']
+
+SHA1_BACKEND = select_sha1_backend()
+_LOGGER.debug("Using %s SHA-1 backend for SoftPLC login", SHA1_BACKEND)
+sha1_hash = SHA1_BACKENDS[SHA1_BACKEND]
+
+
+class NeoreError(Exception):
+    """Base error raised when the PLC cannot be reached or read."""
+
+
+class NeoreAuthError(NeoreError):
+    """Raised when logging in to the PLC fails."""
+
+
+def create_session():
+    """Create a pooled keep-alive HTTP session for a single PLC.
+
+    Cookies are handled by NeoreSessionManager, so the session's own jar is
+    disabled to keep stale SoftPLC cookies from being replayed.
+    """
+    connector = aiohttp.TCPConnector(limit_per_host=2, keepalive_timeout=KEEPALIVE_TIMEOUT, ssl=False)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar(), timeout=timeout)
+
+
+class NeoreSessionManager:
+    """Authenticated SoftPLC session of a single PLC."""
+
+    def __init__(self, url, username, password, session: aiohttp.ClientSession, metrics=None):
+        self.url = url if url.endswith('/') else url + '/'
+        self.username = username
+        self.password = password
+        self.session = session
+        self.cookie = None
+        self._cookie_expires = 0.0
+        self._login_lock = asyncio.Lock()
+        self.login_count = 0
+        # Login and request timings and response sizes
+        self.metrics = metrics if metrics is not None else PollMetrics()
+
+    @property
+    def cookie_valid(self):
+        """Return True while the cached cookie is within its lifetime."""
+        return self.cookie is not None and time.monotonic() < self._cookie_expires
+
+    def touch(self):
+        """Extend the cookie lifetime after the PLC accepted it."""
+        if self.cookie is not None:
+            self._cookie_expires = time.monotonic() + COOKIE_LIFETIME
+
+    def invalidate(self, cookie):
+        """Drop the cookie the PLC just rejected.
+
+        Only the rejected cookie is dropped: if another request already
+        logged in again, its fresh cookie is kept.
+        """
+        if cookie is not None and cookie == self.cookie:
+            _LOGGER.debug("SoftPLC cookie rejected, will log in again")
+            self.cookie = None
+            self._cookie_expires = 0.0
+
+    @staticmethod
+    def validators_of(response: aiohttp.ClientResponse):
+        """Return the conditional request headers that revalidate a response, if the PLC sent any."""
+        validators = {}
+        if 'ETag' in response.headers:
+            validators['If-None-Match'] = response.headers['ETag']
+        if 'Last-Modified' in response.headers:
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        return validators
+
+    @staticmethod
+    def is_rejected(response: aiohttp.ClientResponse):
+        """Return True if the PLC refused the cookie or sent us to the login page."""
+        if response.status in REJECTED_STATUSES:
+            return True
+        return response.url.path.upper().endswith('LOGIN.XML')
+
+    def sha1_hash(self, input_string):
+        """Return the hex SHA-1 digest the PLC expects for cookie + password."""
+        return sha1_hash(input_string)
+
+    async def async_get_cookie(self):
+        """Return a valid cookie, logging in at most once per expiry.
+
+        Concurrent callers wait on the same login instead of each starting
+        their own handshake.
+        """
+        if self.cookie_valid:
+            return self.cookie
+        async with self._login_lock:
+            # Another caller may have logged in while we were waiting
+            if not self.cookie_valid:
+                await self.async_login()
+        return self.cookie
+
+    async def async_login(self):
+        start = time.perf_counter()
+        try:
+            return await self._async_login()
+        finally:
+            self.metrics.observe('login', time.perf_counter() - start)
+
+    async def _async_login(self):
+        session = self.session
+        # Step 1: Make a GET request to retrieve the SoftPLC cookie
+        try:
+            async with session.get(f"{self.url}LOGIN.XML") as get_response:
+                softplc_cookie = get_response.cookies['SoftPLC'].value
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError) as e:
+            raise NeoreAuthError(f"Error during GET request for cookie: {e!r}") from e
+
+        # Step 2: Use the SoftPLC cookie value in the hash
+        payload_hash = self.sha1_hash(softplc_cookie + self.password)
+
+        # Step 3: Make the POST request with the updated payload
+        payload = {
+            'USER': self.username,
+            'PASS': payload_hash
+        }
+
+        try:
+            async with session.post(f"{self.url}LOGIN.XML", data=payload, cookies={'SoftPLC': softplc_cookie}) as post_response:
+                if post_response.status == 200 and 'SoftPLC' in post_response.cookies:
+                    self.cookie = post_response.cookies['SoftPLC'].value
+                    self.login_count += 1
+                    self.touch()
                     _LOGGER.debug("Login successful.")
                 else:
-                    _LOGGER.warning(f"Login failed. Status code: {post_response.status_code}, Response: {post_response.text}")
-            except requests.RequestException as e:
-                _LOGGER.error(f"Error during POST login: {e}")
+                    text = await post_response.text()
+                    raise NeoreAuthError(f"Login failed. Status code: {post_response.status}, Response: {text}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise NeoreAuthError(f"Error during POST login: {e!r}") from e
 
         return self.cookie
 
+    async def async_get(self, path):
+        """GET a page with the session cookie and return its body.
+
+        A rejected cookie or a dropped keep-alive connection is retried once,
+        after logging in again if needed.
+        """
+        content, _ = await self._async_request('GET', path)
+        return content
+
+    async def async_get_conditional(self, path, validators=None):
+        """GET a page unless it is unchanged since the response ``validators`` came from.
+
+        Returns the body and the validators of the new response, or None
+        and the given validators if the PLC answers that the page has not
+        been modified. Nothing is cached here: the caller keeps the
+        validators together with the body they describe.
+        """
+        return await self._async_request('GET', path, headers=validators or None)
+
+    async def async_post(self, path, data):
+        """POST form fields to a page with the session cookie and return the response body.
+
+        Setting register values is idempotent, so this is retried like a GET.
+        """
+        content, _ = await self._async_request('POST', path, data=data)
+        return content
+
+    async def _async_request(self, method, path, headers=None, data=None):
+        """Send a request and return its body and validators; see async_get_conditional."""
+        for attempt in range(2):
+            cookie = await self.async_get_cookie()
+            start = time.perf_counter()
+            try:
+                async with self.session.request(
+                    method, f"{self.url}{path}", cookies={'SoftPLC': cookie}, headers=headers, data=data
+                ) as response:
+                    if self.is_rejected(response):
+                        self.invalidate(cookie)
+                        if attempt == 0:
+                            continue
+                        raise NeoreAuthError(f"PLC rejected session for {path}. Status code: {response.status}")
+                    if response.status == 304 and headers:
+                        self.touch()
+                        return None, headers
+                    content = await response.read()
+                    if response.status != 200:
+                        raise NeoreError(
+                            f"Failed to {method} endpoint {path}. Status code: {response.status} \n {content!r}"
+                        )
+                    validators = self.validators_of(response)
+            except aiohttp.ServerDisconnectedError as e:
+                # The PLC closed an idle pooled connection; a fresh one will do
+                if attempt == 0:
+                    continue
+                raise NeoreError(f"Error requesting endpoint {path}: {e}") from e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise NeoreError(f"Error requesting endpoint {path}: {e!r}") from e
+            finally:
+                self.metrics.observe('request', time.perf_counter() - start)
+            self.metrics.add_bytes(len(content))
+            self.touch()
+            return content, validators
+
 # Usage example:
-# session_manager = NeoreSessionManager("http://192.168.0.152/", "your_username", "your_password")
-# cookie = session_manager.login()
+# session_manager = NeoreSessionManager("http://192.168.0.152/", "your_username", "your_password", create_session())
+# content = await session_manager.async_get("PAGE70.XML")
@@ -0,0 +1,241 @@
+"""Benchmarks for the Neore hot paths.
+
+The CPU micro-benchmarks run in process; the end-to-end ones poll local
+simulated SoftPLCs (see simulator.py). Run from the directory that
+contains the integration, e.g.::
+
+    python -m custom_components.neore.benchmark --plcs 20
+
+With ``--check`` it exits with status 1 if a measurement is over its
+budget in BUDGETS.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from .authentication import SHA1_BACKEND, SHA1_BACKENDS, NeoreSessionManager, create_session, verify_sha1_backend
+from .page_parser import extract_registers
+from .plc_data_manager import NeoreDataManager
+from .simulator import DEFAULT_REGISTERS, SimulatedPLC
+
+# A typical SoftPLC challenge cookie and password, as hashed on every login
+LOGIN_MESSAGE = "4F3A9C21E07B5D18" + "correct horse battery staple"
+
+# Upper bounds for --check, 10 to 25 times what a desktop machine measures,
+# so that a regression trips them and a slow or busy host does not
+BUDGETS = {
+    "login_hash_us": 25,  # active backend, CPU per login
+    "selective_parse_us": 10000,  # CPU per 500-INPUT page
+    "selective_parse_peak_kib": 128,
+    "login_round_trip_ms": 50,  # median, no simulated latency
+    "poll_cycle_ms": 50,  # median of one PLC, no simulated latency
+}
+
+
+def bench_login_hash(iterations=2000):
+    """Return the CPU cost per login hash in microseconds for every backend.
+
+    A backend that does not reproduce the known answers is not timed and
+    reported with a cost of None.
+    """
+    results = {}
+    for name, backend in SHA1_BACKENDS.items():
+        if not verify_sha1_backend(backend):
+            results[name] = None
+            continue
+        start = time.process_time()
+        for _ in range(iterations):
+            backend(LOGIN_MESSAGE)
+        results[name] = (time.process_time() - start) / iterations * 1e6
+    return results
+
+
+def build_page(register_count):
+    """Return a synthetic PAGE70.XML body with the given number of INPUTs."""
+    inputs = "".join(
+        f'<INPUT NAME="__R{7000 + i}_REAL_.1f" VALUE="{i % 50}.{i % 10}"/>' for i in range(register_count)
+    )
+    return f'<?xml version="1.0" encoding="ISO-8859-1"?><PAGE>{inputs}</PAGE>'.encode('latin1')
+
+
+def _full_tree_parse(content):
+    root = ET.fromstring(content)
+    return {element.get('NAME'): element.get('VALUE') for element in root.findall('.//INPUT')}
+
+
+def bench_parse(register_count=500, wanted_count=13, iterations=200):
+    """Compare a full tree parse with selective extraction of a few registers.
+
+    Returns ``{name: (us per parse, peak KiB)}`` plus the extraction stats.
+    """
+    content = build_page(register_count)
+    # Spread the wanted registers over the page like the real sensors are
+    step = max(1, register_count // wanted_count)
+    wanted = frozenset(f"__R{7000 + i}_REAL_.1f" for i in range(0, register_count, step)[:wanted_count])
+    candidates = {
+        "full tree": lambda: _full_tree_parse(content),
+        "selective": lambda: extract_registers(content, wanted),
+    }
+    results = {}
+    for name, parse in candidates.items():
+        start = time.process_time()
+        for _ in range(iterations):
+            parse()
+        cost = (time.process_time() - start) / iterations * 1e6
+        tracemalloc.start()
+        parse()
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+        results[name] = (cost, peak)
+    return results, extract_registers(content, wanted)[1]
+
+
+def _percentiles(samples):
+    """Return (median, 95th percentile, max) of the samples in milliseconds."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))]
+    return statistics.median(ordered) * 1000, p95 * 1000, ordered[-1] * 1000
+
+
+async def bench_login(iterations=50, latency=0.0):
+    """Return wall-clock login round trips in ms as (median, p95, max)."""
+    plc = SimulatedPLC(latency=latency)
+    url = await plc.start()
+    session = create_session()
+    try:
+        manager = NeoreSessionManager(url, plc.username, plc.password, session)
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await manager.async_login()
+            samples.append(time.perf_counter() - start)
+    finally:
+        await session.close()
+        await plc.stop()
+    return _percentiles(samples)
+
+
+async def bench_poll_cycles(plc_count=1, cycles=20, registers=250, latency=0.0):
+    """Poll simulated PLCs side by side, every page on every cycle.
+
+    Each PLC gets its own session and data manager subscribed to all the
+    registers the sensors read. Returns the first cycle (which includes
+    the logins), the later cycles as (median, p95, max) in ms, and the
+    combined simulator stats.
+    """
+    plcs = [
+        SimulatedPLC(page_sizes={page: registers for page in DEFAULT_REGISTERS}, latency=latency)
+        for _ in range(plc_count)
+    ]
+    sessions = [create_session() for _ in plcs]
+    managers = []
+    try:
+        for plc, session in zip(plcs, sessions):
+            url = await plc.start()
+            # A zero interval makes every page due on every cycle
+            manager = NeoreDataManager(session, url, plc.username, plc.password, {page: 0 for page in DEFAULT_REGISTERS})
+            for page, values in DEFAULT_REGISTERS.items():
+                for name in values:
+                    manager.subscribe(name, page)
+            managers.append(manager)
+
+        samples = []
+        for _ in range(cycles):
+            start = time.perf_counter()
+            await asyncio.gather(*(manager.async_update() for manager in managers))
+            samples.append(time.perf_counter() - start)
+    finally:
+        for manager in managers:
+            await manager.async_close()
+        for session in sessions:
+            await session.close()
+        for plc in plcs:
+            await plc.stop()
+
+    stats = {}
+    for plc in plcs:
+        for key, value in plc.stats.items():
+            stats[key] = stats.get(key, 0) + value
+    return samples[0] * 1000, _percentiles(samples[1:] or samples), stats
+
+
+def check_budgets(measurements, budgets=BUDGETS):
+    """Return a message for every measurement over its budget.
+
+    Measurements without a budget, and budgets not measured, are skipped.
+    """
+    return [
+        f"{name} is {measurements[name]:.2f}, over its budget of {budget}"
+        for name, budget in budgets.items()
+        if measurements.get(name) is not None and measurements[name] > budget
+    ]
+
+
+async def _async_main(args, measurements):
+    print(f"Login round trip against the simulator ({args.latency * 1000:.0f} ms latency)")
+    median, p95, worst = await bench_login(latency=args.latency)
+    print(f"  median {median:8.2f} ms, p95 {p95:8.2f} ms, max {worst:8.2f} ms")
+    if not args.latency:
+        measurements["login_round_trip_ms"] = median
+
+    for plc_count in sorted({1, args.plcs}):
+        first, (median, p95, worst), stats = await bench_poll_cycles(
+            plc_count, args.cycles, args.registers, args.latency
+        )
+        if plc_count == 1 and not args.latency:
+            measurements["poll_cycle_ms"] = median
+        print(f"Poll cycle, {plc_count} PLC(s) in parallel, {args.cycles} cycles of {len(DEFAULT_REGISTERS)} pages")
+        print(f"  first    {first:8.2f} ms (with login)")
+        print(f"  median {median:8.2f} ms, p95 {p95:8.2f} ms, max {worst:8.2f} ms")
+        print(
+            f"  {stats['logins']} logins, {stats['page_requests']} page requests, "
+            f"{stats['bytes_sent'] / 1024:.0f} KiB served"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Neore performance benchmarks")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--registers", type=int, default=500, help="INPUT elements per simulated page")
+    parser.add_argument("--plcs", type=int, default=10, help="simulated PLCs polled side by side")
+    parser.add_argument("--cycles", type=int, default=20, help="poll cycles per end-to-end run")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated PLC response time in seconds")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if a measurement is over budget")
+    args = parser.parse_args(argv)
+
+    measurements = {}
+    print(f"Login hash (active backend: {SHA1_BACKEND})")
+    hash_costs = bench_login_hash(args.iterations)
+    measurements["login_hash_us"] = hash_costs.get(SHA1_BACKEND)
+    for name, cost in hash_costs.items():
+        if cost is None:
+            print(f"  {name:<10} FAILED the known-answer check, not used")
+        else:
+            print(f"  {name:<10} {cost:10.2f} us CPU per login")
+
+    results, stats = bench_parse(args.registers)
+    page_size = len(build_page(args.registers))
+    print(f"Page parse ({args.registers} INPUTs, scanned {stats.scanned}, kept {stats.kept})")
+    for name, (cost, peak) in results.items():
+        print(
+            f"  {name:<10} {cost:10.2f} us CPU per page, {page_size / cost:6.1f} MB/s, {peak:8.1f} KiB peak"
+        )
+    if args.registers == 500:
+        measurements["selective_parse_us"], measurements["selective_parse_peak_kib"] = results["selective"]
+
+    asyncio.run(_async_main(args, measurements))
+
+    if args.check:
+        overruns = check_budgets(measurements)
+        for message in overruns:
+            print(f"OVER BUDGET: {message}")
+        if overruns:
+            sys.exit(1)
+        print(f"All {len(measurements)} measurements within budget")
+
+
+if __name__ == "__main__":
+    main()
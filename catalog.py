@@ -0,0 +1,72 @@
+import hashlib
+import logging
+from typing import NamedTuple
+from .page_parser import extract_registers
+from .registers import decode_register_name
+
+_LOGGER = logging.getLogger(__name__)
+
+# Pages crawled for register discovery; the first one also identifies the firmware
+DISCOVERY_PAGES = ('PAGE70.XML', 'PAGE69.XML')
+
+
+class RegisterInfo(NamedTuple):
+    """A register found on a PLC page, decoded from its name."""
+
+    name: str
+    page: str
+    address: int | None
+    data_type: str | None
+    precision: int | None
+
+
+def page_signature(names):
+    """Return a short fingerprint of a page layout.
+
+    The INPUT names of a page only change with the PLC program, so their
+    hash identifies the firmware without reading any version register.
+    """
+    digest = hashlib.sha1('\n'.join(sorted(names)).encode('latin1', 'replace'))
+    return digest.hexdigest()[:16]
+
+
+def build_catalog(page_names):
+    """Decode ``{page: [register names]}`` into ``{name: RegisterInfo}``.
+
+    A register that appears on several pages is listed under the first.
+    """
+    catalog = {}
+    for page, names in page_names.items():
+        for name in names:
+            if name in catalog:
+                continue
+            spec = decode_register_name(name)
+            catalog[name] = RegisterInfo(name, page, spec.address, spec.data_type, spec.precision)
+    return catalog
+
+
+async def async_discover(session_manager, pages=DISCOVERY_PAGES, cached=None):
+    """Enumerate the registers on the PLC pages, reusing a cached crawl if possible.
+
+    ``cached`` is the dict returned by a previous call. Only the first page
+    is fetched to compute the signature; when it matches the cache, the
+    other pages are not crawled again. Returns ``(result, crawled)``.
+    """
+    first, *others = pages
+    content = await session_manager.async_get(first)
+    first_names = list(extract_registers(content)[0])
+    signature = page_signature(first_names)
+
+    if cached and cached.get('signature') == signature and set(cached.get('pages', ())) == set(pages):
+        _LOGGER.debug("Register catalog signature %s unchanged, using cache", signature)
+        return cached, False
+
+    page_names = {first: first_names}
+    for page in others:
+        content = await session_manager.async_get(page)
+        page_names[page] = list(extract_registers(content)[0])
+    _LOGGER.info(
+        "Discovered %d registers on %d pages (signature %s)",
+        sum(len(names) for names in page_names.values()), len(page_names), signature,
+    )
+    return {'signature': signature, 'pages': page_names}, True
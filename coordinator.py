@@ -0,0 +1,375 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+from . import DOMAIN
+from .authentication import NeoreError
+from .catalog import build_catalog
+from .deadband import DEFAULT_HEARTBEAT, Deadband, PublishStats, StatePublisher
+from .hourly import STATISTICS
+from .plc_data_manager import NeoreDataManager, COOLDOWN_TIME
+from .scheduler import MIN_POLL_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+# Entities subscribe one by one while the platform is set up; wait this long
+# so their first fetch is shared
+SUBSCRIBE_REFRESH_DELAY = 1
+
+STORAGE_VERSION = 1
+# Energy totals are written at most this often (and on shutdown)
+ENERGY_SAVE_DELAY = 60
+# The last snapshot is written at most this often (and on shutdown); older
+# than SNAPSHOT_MAX_AGE it is not worth showing after a restart
+SNAPSHOT_SAVE_DELAY = 60
+SNAPSHOT_MAX_AGE = 24 * 60 * 60
+# Archived snapshots are written in batches this often (and on shutdown)
+ARCHIVE_FLUSH_INTERVAL = 5 * 60
+
+
+class NeoreCoordinator(DataUpdateCoordinator):
+    """Poll the PLC pages entities need and push each snapshot to all entities.
+
+    The refresh interval follows the scheduler: after each poll the
+    coordinator wakes up again when the next page is due. While the PLC
+    fails, retries back off exponentially with jitter.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        data_manager: NeoreDataManager,
+        device_name,
+        unique_id_prefix,
+        poll_semaphore: asyncio.Semaphore,
+        deadbands=None,
+        heartbeat=DEFAULT_HEARTBEAT,
+        discover=False,
+    ):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {device_name}",
+            update_interval=timedelta(seconds=COOLDOWN_TIME),
+            request_refresh_debouncer=Debouncer(
+                hass, _LOGGER, cooldown=SUBSCRIBE_REFRESH_DELAY, immediate=False
+            ),
+        )
+        self.data_manager = data_manager
+        self.device_name = device_name
+        # Prefix of every unique ID and storage key of this heat pump
+        self.unique_id_prefix = unique_id_prefix
+        self._poll_semaphore = poll_semaphore
+        self.consecutive_failures = 0
+        # Configured deadbands by sensor unique ID, overriding the sensor defaults
+        self._deadbands = {key: Deadband.parse(value) for key, value in (deadbands or {}).items()}
+        self._heartbeat = heartbeat
+        self.publish_stats = PublishStats()
+        # Called after failed polls that are not pushed to the entities
+        self._failure_listeners = []
+        self._energy_store = Store(hass, STORAGE_VERSION, f"{unique_id_prefix}.energy")
+        # Create disabled sensors for every register found on the PLC
+        self.discover = discover
+        self._catalog_store = Store(hass, STORAGE_VERSION, f"{unique_id_prefix}.catalog")
+        self._snapshot_store = Store(hass, STORAGE_VERSION, f"{unique_id_prefix}.snapshot")
+        # HourlyStatistic -> HourlyAggregator, once statistics are enabled
+        self._statistics = {}
+        self._statistics_unsubscribe = []
+        # Run by async_shutdown(), newest first
+        self._on_shutdown = []
+
+    async def async_restore_energy(self):
+        """Continue the energy totals of the previous run."""
+        data = await self._energy_store.async_load()
+        if data:
+            self.data_manager.restore_energy(data.get("totals", {}))
+
+    async def async_restore_snapshot(self):
+        """Show the last snapshot of the previous run until the first fetch.
+
+        Returns True if a snapshot was restored; it is marked stale, and its
+        pages are due straight away.
+        """
+        data = await self._snapshot_store.async_load()
+        if not data:
+            return False
+        age = time.time() - data["updated_at"]
+        if age > SNAPSHOT_MAX_AGE:
+            _LOGGER.debug("Not restoring the %s snapshot, it is %.0f s old", self.device_name, age)
+            return False
+        self.data_manager.restore_snapshot(data["pages"], data["updated_at"])
+        self.data = self.data_manager.snapshot
+        _LOGGER.info("Restored %d readings of %s from %.0f s ago", len(self.data), self.device_name, age)
+        return True
+
+    @callback
+    def _snapshot_data(self):
+        return {
+            "updated_at": self.data_manager.snapshot.updated_at,
+            "pages": self.data_manager.snapshot_pages(),
+        }
+
+    async def async_get_catalog(self):
+        """Return ``{register name: RegisterInfo}`` of the registers on the PLC.
+
+        The crawl is cached on disk and only repeated when the page layout,
+        and so the PLC program, changed. Falls back to the cached crawl while
+        the PLC is unreachable.
+        """
+        cached = await self._catalog_store.async_load()
+        try:
+            async with self._poll_semaphore:
+                result, crawled = await self.data_manager.async_discover_catalog(cached)
+        except NeoreError as err:
+            _LOGGER.warning("Register discovery on %s failed, using the cached catalog: %s", self.device_name, err)
+            result = cached or {}
+        else:
+            if crawled:
+                await self._catalog_store.async_save(result)
+        return build_catalog(result.get("pages", {}))
+
+    @callback
+    def async_on_shutdown(self, func):
+        """Call ``func`` when the coordinator shuts down; it may be a coroutine function."""
+        self._on_shutdown.append(func)
+
+    async def async_shutdown(self):
+        """Stop polling for unload, reload or Home Assistant shutdown.
+
+        Fetches and writes in flight are cancelled right away. What is
+        pending is written first: the archive, energy totals and snapshot.
+        """
+        await super().async_shutdown()
+        for unsubscribe in self._statistics_unsubscribe:
+            unsubscribe()
+        self._statistics_unsubscribe = []
+        await self.data_manager.async_close()
+        await self.async_flush_archive()
+        await self._energy_store.async_save(self._energy_data())
+        data = self.data_manager.snapshot
+        if data.updated_at is not None and not data.stale:
+            await self._snapshot_store.async_save(self._snapshot_data())
+        while self._on_shutdown:
+            result = self._on_shutdown.pop()()
+            if asyncio.iscoroutine(result):
+                await result
+        _LOGGER.debug("Shut down %s", self.device_name)
+
+    @callback
+    def async_enable_statistics(self):
+        """Aggregate STATISTICS per hour in process and import them into the recorder.
+
+        Their registers stay polled even while the sensors showing them are
+        disabled. Call it after async_restore_energy(), so the energy sums
+        continue from the restored totals.
+        """
+        if "recorder" not in self.hass.config.components:
+            _LOGGER.warning("Long-term statistics of %s need the recorder, which is not loaded", self.device_name)
+            return
+        data_manager = self.data_manager
+        derived = data_manager.derived
+        for statistic in STATISTICS:
+            source = statistic.source
+            if statistic.integrator is not None:
+                integrator = data_manager.integrate(statistic.integrator, statistic.page, source)
+                source = lambda snapshot, integrator=integrator: integrator.total
+            self._statistics[statistic] = data_manager.aggregate_hourly(statistic.key, statistic.page, source)
+            registers = derived.registers_for(statistic.source) if statistic.source in derived else (statistic.source,)
+            for register in registers:
+                self._statistics_unsubscribe.append(self.async_subscribe(register, statistic.page))
+
+    @callback
+    def _async_import_statistics(self):
+        """Import the hours completed since the last poll as external statistics."""
+        # Imported here, the recorder is only loaded when statistics are enabled
+        from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+        for statistic, aggregator in self._statistics.items():
+            hours = aggregator.take()
+            if not hours:
+                continue
+            has_sum = statistic.integrator is not None
+            metadata = {
+                "has_mean": not has_sum,
+                "has_sum": has_sum,
+                "name": f"{self.device_name} {statistic.name}",
+                "source": DOMAIN,
+                "statistic_id": f"{DOMAIN}:{self.unique_id_prefix}_{statistic.key}",
+                "unit_of_measurement": statistic.unit,
+            }
+            if has_sum:
+                rows = [
+                    {"start": dt_util.utc_from_timestamp(hour.start), "state": hour.last, "sum": hour.last}
+                    for hour in hours
+                ]
+            else:
+                rows = [
+                    {"start": dt_util.utc_from_timestamp(hour.start), "mean": hour.mean, "min": hour.min, "max": hour.max}
+                    for hour in hours
+                ]
+            async_add_external_statistics(self.hass, metadata, rows)
+            _LOGGER.debug("Imported %d hours of %s", len(rows), metadata["statistic_id"])
+
+    async def async_flush_archive(self, *_):
+        """Write the snapshots queued for the archive, off the event loop."""
+        archive = self.data_manager.archive
+        if archive is None or not archive.pending:
+            return
+        try:
+            written = await self.hass.async_add_executor_job(archive.flush)
+        except OSError as err:
+            _LOGGER.warning("Could not write the %s archive, will retry: %s", self.device_name, err)
+            return
+        _LOGGER.debug("Archived %d snapshots of %s", written, self.device_name)
+
+    @callback
+    def _energy_data(self):
+        return {"totals": self.data_manager.energy_totals()}
+
+    @property
+    def device_id(self):
+        """Return the identifier that tells this heat pump apart from others."""
+        return self.unique_id_prefix
+
+    def create_publisher(self, unique_id, default_deadband):
+        """Return the state publisher for a sensor, honouring configured deadbands."""
+        return StatePublisher(
+            self._deadbands.get(unique_id, default_deadband), self._heartbeat, self.publish_stats
+        )
+
+    @callback
+    def async_subscribe(self, register, page):
+        """Poll a register's page for an entity; return the unsubscribe callback."""
+        if self.data_manager.subscribe(register, page):
+            # Fetch a newly needed register soon instead of on the next tick
+            self.hass.async_create_task(self.async_request_refresh())
+
+        @callback
+        def _async_unsubscribe():
+            self.data_manager.unsubscribe(register, page)
+
+        return _async_unsubscribe
+
+    @callback
+    def async_add_failure_listener(self, update_callback):
+        """Call back after a failed poll that is not pushed; return the remove callback.
+
+        DataUpdateCoordinator leaves the entities alone when a poll fails
+        after a failed poll, but the diagnostic sensors have to count it.
+        """
+        self._failure_listeners.append(update_callback)
+
+        @callback
+        def _async_remove():
+            self._failure_listeners.remove(update_callback)
+
+        return _async_remove
+
+    async def async_write(self, register, page, value):
+        """Set a register on the PLC and push the confirmed value to all entities."""
+        try:
+            data = await self.data_manager.async_write(register, page, value)
+        except NeoreError as err:
+            raise HomeAssistantError(f"Could not set {register} on {self.device_name}: {err}") from err
+        self.async_set_updated_data(data)
+
+    async def async_refresh_pages(self, pages=None):
+        """Poll pages right away, for the refresh service.
+
+        Returns False if none of the pages is polled. Pages polled moments
+        ago are fetched once the minimum refresh spacing has passed; a fetch
+        already in flight is shared instead of repeated.
+        """
+        delay = self.data_manager.request_refresh(pages)
+        if delay is None:
+            return False
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.async_refresh()
+        return True
+
+    async def _async_update_data(self):
+        """Fetch the due pages and return a fresh snapshot."""
+        _LOGGER.debug("State writes so far: %s", self.publish_stats)
+        try:
+            async with self._poll_semaphore:
+                data = await self.data_manager.async_update()
+        except NeoreError as err:
+            if self._shutdown_requested:
+                # Cancelled by async_shutdown(); there is nothing to report
+                return self.data
+            # Every due page failed; each is retried after its own backoff
+            self.consecutive_failures += 1
+            self._schedule_next_poll()
+            if not self.last_update_success:
+                for update_callback in list(self._failure_listeners):
+                    update_callback()
+            raise UpdateFailed(str(err)) from err
+        self.consecutive_failures = 0
+        if self._listeners:
+            # Entities are set up and hold their own subscriptions
+            self.data_manager.release_restored()
+        self._schedule_next_poll()
+        self._energy_store.async_delay_save(self._energy_data, ENERGY_SAVE_DELAY)
+        if self._statistics:
+            self._async_import_statistics()
+        if data.updated_at is not None and not data.stale:
+            self._snapshot_store.async_delay_save(self._snapshot_data, SNAPSHOT_SAVE_DELAY)
+        return data
+
+    @callback
+    def async_update_listeners(self):
+        """Push the snapshot to the entities and time how long that takes.
+
+        Every poll is pushed, also one that found every page unchanged:
+        energy, rolling and diagnostic sensors move with time alone. The
+        state publishers drop the writes of values that did not move.
+        """
+        start = time.perf_counter()
+        super().async_update_listeners()
+        self.data_manager.metrics.observe("publish", time.perf_counter() - start)
+
+    @callback
+    def diagnostics(self):
+        """Return the state of the poll loop, for troubleshooting."""
+        data_manager = self.data_manager
+        scheduler = data_manager.scheduler
+        data_age = data_manager.data_age()
+        return {
+            "device": self.device_name,
+            "last_update_success": self.last_update_success,
+            "consecutive_failures": self.consecutive_failures,
+            "logins": data_manager.login_count,
+            "data_age": None if data_age is None else round(data_age, 1),
+            "stale": data_manager.snapshot.stale,
+            "registers": len(data_manager.snapshot),
+            "pages": {
+                page: {
+                    "interval": scheduler.interval(page),
+                    "failures": scheduler.failures(page),
+                    "subscribed": len(scheduler.wanted(page)),
+                    "parse": data_manager.parse_stats[page]._asdict() if page in data_manager.parse_stats else None,
+                }
+                for page in scheduler.pages
+            },
+            "state_writes": self.publish_stats.as_dict(),
+            "last_cycle_changed": data_manager.last_cycle_changed,
+            "archive": None if data_manager.archive is None else {
+                "pending": data_manager.archive.pending,
+                "records_written": data_manager.archive.records_written,
+                "bytes_written": data_manager.archive.bytes_written,
+            },
+            **data_manager.metrics.as_dict(),
+        }
+
+    def _schedule_next_poll(self):
+        """Wake up again when the next page is due."""
+        next_due = self.data_manager.scheduler.next_due_in()
+        if next_due is None:
+            next_due = COOLDOWN_TIME
+        self.update_interval = timedelta(seconds=max(MIN_POLL_INTERVAL, next_due))
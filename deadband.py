@@ -0,0 +1,86 @@
+import logging
+import time
+from typing import NamedTuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Write the state at least this often so history graphs stay continuous
+DEFAULT_HEARTBEAT = 15 * 60
+
+
+class Deadband(NamedTuple):
+    """How far a value has to move before it is published again.
+
+    A change is published once it exceeds the absolute band or the relative
+    band (a fraction of the last published value), whichever is larger.
+    The default of zero publishes every change and suppresses repeats.
+    """
+
+    absolute: float = 0.0
+    relative: float = 0.0
+
+    @classmethod
+    def parse(cls, value):
+        """Build a deadband from config: a number, or a percentage like "2%"."""
+        if isinstance(value, str) and value.strip().endswith('%'):
+            return cls(relative=float(value.strip()[:-1]) / 100)
+        return cls(absolute=float(value))
+
+    def exceeded(self, old, new):
+        """Return True if the change from old to new is outside the band."""
+        if old is None or new is None:
+            return old is not new
+        if isinstance(old, bool) or not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            return old != new
+        band = max(self.absolute, self.relative * abs(old))
+        if band == 0:
+            return new != old
+        # Allow for float noise when the value moves by exactly one band
+        return abs(new - old) >= band - 1e-9
+
+
+class PublishStats:
+    """Counts of state writes that were made and skipped."""
+
+    __slots__ = ('published', 'suppressed')
+
+    def __init__(self):
+        self.published = 0
+        self.suppressed = 0
+
+    def as_dict(self):
+        return {'published': self.published, 'suppressed': self.suppressed}
+
+    def __repr__(self):
+        return f"PublishStats(published={self.published}, suppressed={self.suppressed})"
+
+
+class StatePublisher:
+    """Decide per sensor whether a new value is worth a state write."""
+
+    __slots__ = ('_deadband', '_heartbeat', '_stats', '_value', '_available', '_published_at')
+
+    def __init__(self, deadband, heartbeat, stats):
+        self._deadband = deadband
+        self._heartbeat = heartbeat
+        self._stats = stats
+        self._value = None
+        self._available = None
+        self._published_at = None
+
+    def should_publish(self, value, available, now=None):
+        """Return True, and remember the value, if it has to be written."""
+        now = time.monotonic() if now is None else now
+        if (
+            self._published_at is None
+            or available != self._available
+            or now - self._published_at >= self._heartbeat
+            or self._deadband.exceeded(self._value, value)
+        ):
+            self._value = value
+            self._available = available
+            self._published_at = now
+            self._stats.published += 1
+            return True
+        self._stats.suppressed += 1
+        return False
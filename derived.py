@@ -0,0 +1,112 @@
+import logging
+from typing import Any, Callable, NamedTuple
+from .registers import RegisterValue
+
+_LOGGER = logging.getLogger(__name__)
+
+FLOW_FIELD = "__R7083_REAL_.1f"  # m³/h
+OUTPUT_TEMPERATURE_FIELD = "__R15104_REAL_.1f"  # °C
+INPUT_TEMPERATURE_FIELD = "__R7096_REAL_.1f"  # °C
+POWER_FIELD = "__R7087_REAL_.1f"  # electrical kW
+
+# Specific heat of water (kJ/kg·°C) × density (≈1000 kg/m³) / 3600 (s/h):
+# kW delivered per m³/h of flow and °C of temperature difference
+WATER_KW_PER_M3H_K = 4.186 * 1000 / 3600
+
+
+class DerivedMetric(NamedTuple):
+    """A value calculated from registers and other derived metrics.
+
+    ``compute`` is called with the values of ``inputs``, in order, once
+    all of them are known; it may return None if the result is undefined.
+    """
+
+    key: str
+    inputs: tuple
+    compute: Callable[..., Any]
+    precision: int | None = None
+
+
+def _cop(thermal_power, power, temperature_delta):
+    # Undefined while the compressor is off or the circuit is not heating
+    if power <= 0 or temperature_delta <= 0:
+        return None
+    return thermal_power / power
+
+
+# Every derived metric, published in the snapshot next to the registers.
+# Subexpressions shared by several metrics are metrics of their own, so
+# they are calculated once per snapshot.
+DERIVED_METRICS = (
+    DerivedMetric(
+        "temperature_delta", (OUTPUT_TEMPERATURE_FIELD, INPUT_TEMPERATURE_FIELD), lambda out, inp: out - inp, 1
+    ),
+    DerivedMetric(
+        "thermal_power", (FLOW_FIELD, "temperature_delta"), lambda flow, delta: flow * delta * WATER_KW_PER_M3H_K, 3
+    ),
+    DerivedMetric("cop", ("thermal_power", POWER_FIELD, "temperature_delta"), _cop, 2),
+)
+
+
+class DerivedMetrics:
+    """Evaluate a table of derived metrics in dependency order."""
+
+    def __init__(self, metrics=DERIVED_METRICS):
+        self._metrics = {metric.key: metric for metric in metrics}
+        self._order = self._resolve_order()
+
+    def _resolve_order(self):
+        order = []
+        state = {}  # key -> 'visiting' or 'done'
+
+        def visit(key):
+            if state.get(key) == 'done':
+                return
+            if state.get(key) == 'visiting':
+                raise ValueError(f"Derived metric {key} depends on itself")
+            state[key] = 'visiting'
+            for name in self._metrics[key].inputs:
+                if name in self._metrics:
+                    visit(name)
+            state[key] = 'done'
+            order.append(self._metrics[key])
+
+        for key in self._metrics:
+            visit(key)
+        return tuple(order)
+
+    def __contains__(self, key):
+        return key in self._metrics
+
+    def registers_for(self, key):
+        """Return the registers a metric is ultimately calculated from."""
+        registers = []
+        for name in self._metrics[key].inputs:
+            for register in self.registers_for(name) if name in self._metrics else (name,):
+                if register not in registers:
+                    registers.append(register)
+        return tuple(registers)
+
+    def evaluate(self, readings, updated_at):
+        """Return ``{key: RegisterValue}`` of every metric for ``{name: RegisterValue}``."""
+        values = {}
+        results = {}
+        for metric in self._order:
+            args = []
+            for name in metric.inputs:
+                if name in values:
+                    args.append(values[name])
+                else:
+                    reading = readings.get(name)
+                    args.append(None if reading is None else reading.value)
+            value = None
+            if None not in args:
+                try:
+                    value = metric.compute(*args)
+                except (ArithmeticError, TypeError) as e:
+                    _LOGGER.debug("Could not calculate %s: %s", metric.key, e)
+                if value is not None and metric.precision is not None:
+                    value = round(value, metric.precision)
+            values[metric.key] = value
+            results[metric.key] = RegisterValue(value, updated_at)
+        return results
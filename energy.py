@@ -0,0 +1,40 @@
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Samples further apart than this are not integrated across: the power
+# in between is unknown, so the gap adds nothing instead of a guess
+MAX_GAP = 5 * 60
+
+
+class EnergyIntegrator:
+    """Integrate a power series in kW into a running energy total in kWh.
+
+    Uses the trapezoidal rule between consecutive samples. Negative power
+    counts as zero so the total only ever increases, as Home Assistant
+    expects from a TOTAL_INCREASING sensor.
+    """
+
+    __slots__ = ('total', 'max_gap', '_last_value', '_last_time')
+
+    def __init__(self, total=0.0, max_gap=MAX_GAP):
+        self.total = total
+        self.max_gap = max_gap
+        self._last_value = None
+        self._last_time = None
+
+    def add(self, power, timestamp):
+        """Add a power sample taken at ``timestamp`` (seconds)."""
+        if power is None:
+            return
+        power = max(0.0, power)
+        if self._last_time is not None:
+            elapsed = timestamp - self._last_time
+            if elapsed <= 0:
+                return
+            if elapsed <= self.max_gap:
+                self.total += (self._last_value + power) / 2 * elapsed / 3600
+            else:
+                _LOGGER.debug("Not integrating across a %.0f s gap", elapsed)
+        self._last_value = power
+        self._last_time = timestamp
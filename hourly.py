@@ -0,0 +1,124 @@
+import logging
+from collections import deque
+from typing import NamedTuple
+from .derived import INPUT_TEMPERATURE_FIELD, OUTPUT_TEMPERATURE_FIELD, POWER_FIELD
+from .energy import MAX_GAP
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = 3600
+STATISTICS_PAGE = 'PAGE70.XML'
+
+
+class HourlyStatistic(NamedTuple):
+    """A long-term statistic aggregated per clock hour in process.
+
+    ``source`` is a register or derived metric. With ``integrator`` set the
+    statistic is the energy total of that integrator, fed by ``source`` as
+    power, and is imported as a sum; otherwise as mean, min and max.
+    """
+
+    key: str
+    name: str
+    unit: str | None
+    source: str
+    integrator: str | None = None
+    page: str = STATISTICS_PAGE
+
+
+# Statistics imported into the recorder, so the sensors behind them can be
+# excluded from it. The statistic ID is derived from the key.
+STATISTICS = (
+    HourlyStatistic("power", "Power Usage", "kW", POWER_FIELD),
+    HourlyStatistic("thermal_power", "Thermal Power", "kW", "thermal_power"),
+    HourlyStatistic("cop", "COP", None, "cop"),
+    HourlyStatistic("output_temperature", "Output Temperature", "°C", OUTPUT_TEMPERATURE_FIELD),
+    HourlyStatistic("input_temperature", "Input Temperature", "°C", INPUT_TEMPERATURE_FIELD),
+    HourlyStatistic("outdoor_temperature", "Outdoor Temperature", "°C", "__R7079_REAL_.0f"),
+    HourlyStatistic("object_temperature", "Object Temperature", "°C", "__R7195_REAL_.1f"),
+    HourlyStatistic("thermal_energy", "Thermal Energy", "kWh", "thermal_power", integrator="thermal"),
+    HourlyStatistic("electrical_energy", "Electrical Energy", "kWh", POWER_FIELD, integrator="electrical"),
+)
+
+
+class HourSummary(NamedTuple):
+    """Statistics of one clock hour; ``start`` is its Unix time."""
+
+    start: float
+    mean: float
+    min: float
+    max: float
+    last: float
+
+
+class HourlyAggregator:
+    """Time-weighted mean, min and max of a series per clock hour.
+
+    A sample holds until the next one, split at the hour boundary, but not
+    across gaps longer than ``max_gap``. An hour is complete, and queued for
+    take(), once a sample of a later hour arrives.
+    """
+
+    __slots__ = ('max_gap', '_hour', '_area', '_duration', '_min', '_max', '_last_value', '_last_time', '_finished')
+
+    def __init__(self, max_gap=MAX_GAP):
+        self.max_gap = max_gap
+        self._hour = None
+        self._area = 0.0
+        self._duration = 0.0
+        self._min = None
+        self._max = None
+        self._last_value = None
+        self._last_time = None
+        self._finished = deque()
+
+    def _start_hour(self, hour):
+        self._hour = hour
+        self._area = 0.0
+        self._duration = 0.0
+        self._min = None
+        self._max = None
+
+    def _hold(self, value, start, end):
+        self._area += value * (end - start)
+        self._duration += end - start
+        self._sample(value)
+
+    def _sample(self, value):
+        self._min = value if self._min is None else min(self._min, value)
+        self._max = value if self._max is None else max(self._max, value)
+
+    def add(self, value, timestamp):
+        """Add a sample taken at ``timestamp`` (seconds)."""
+        if value is None:
+            return
+        hour = timestamp - timestamp % HOUR
+        if self._hour is None:
+            self._start_hour(hour)
+        else:
+            elapsed = timestamp - self._last_time
+            if elapsed <= 0:
+                return
+            held = elapsed <= self.max_gap
+            end_of_hour = self._hour + HOUR
+            if held:
+                self._hold(self._last_value, self._last_time, min(timestamp, end_of_hour))
+            if hour != self._hour:
+                self._finish()
+                self._start_hour(hour)
+                if held and hour == end_of_hour:
+                    # The previous value carries over into the new hour
+                    self._hold(self._last_value, hour, timestamp)
+        self._sample(value)
+        self._last_value = value
+        self._last_time = timestamp
+
+    def _finish(self):
+        mean = self._area / self._duration if self._duration > 0 else self._last_value
+        self._finished.append(HourSummary(self._hour, mean, self._min, self._max, self._last_value))
+
+    def take(self):
+        """Return the hours completed since the last call, oldest first."""
+        finished = list(self._finished)
+        self._finished.clear()
+        return finished
@@ -0,0 +1,93 @@
+import bisect
+import math
+
+# Upper bucket bounds of the latency histograms, in milliseconds
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, math.inf)
+
+# Stages of a poll cycle that are timed
+STAGES = ('login', 'request', 'parse', 'publish', 'cycle')
+
+
+class LatencyHistogram:
+    """Counts of durations per millisecond bucket, keyed by the bucket's upper bound."""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, milliseconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 2) if self.count else None,
+            'max_ms': round(self.max, 2),
+            'buckets': {
+                ('inf' if math.isinf(bound) else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.counts)
+            },
+        }
+
+
+class PollMetrics:
+    """Where the time of each poll cycle goes, and how much was transferred.
+
+    ``last_cycle`` holds the milliseconds spent per stage in the latest
+    cycle; every single observation also lands in the stage's histogram.
+    """
+
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.last_cycle = dict.fromkeys(STAGES, 0.0)
+        self._current = dict.fromkeys(STAGES, 0.0)
+        self.last_cycle_bytes = 0
+        self.total_bytes = 0
+        self._current_bytes = 0
+        # Page fetches whose parse was skipped, by how the page was known unchanged
+        self.unchanged = {'not_modified': 0, 'identical': 0}
+
+    def begin_cycle(self):
+        self._current = dict.fromkeys(STAGES, 0.0)
+        self._current_bytes = 0
+
+    def end_cycle(self, seconds):
+        self.observe('cycle', seconds)
+        # Shared until the next cycle begins, so the publishing that follows
+        # the fetch still counts towards this cycle
+        self.last_cycle = self._current
+        self.last_cycle_bytes = self._current_bytes
+
+    def observe(self, stage, seconds):
+        """Record time spent in a stage."""
+        milliseconds = seconds * 1000
+        self.histograms[stage].observe(milliseconds)
+        self._current[stage] += milliseconds
+
+    def add_bytes(self, count):
+        self._current_bytes += count
+        self.total_bytes += count
+
+    def count_unchanged(self, kind):
+        """Count a page that did not have to be parsed."""
+        self.unchanged[kind] += 1
+
+    def as_dict(self):
+        parse = self.histograms['parse']
+        skipped = sum(self.unchanged.values())
+        return {
+            'last_cycle_ms': {stage: round(value, 2) for stage, value in self.last_cycle.items()},
+            'last_cycle_bytes': self.last_cycle_bytes,
+            'total_bytes': self.total_bytes,
+            'unchanged_pages': dict(self.unchanged),
+            # What the skipped parses would have cost at the average parse time
+            'parse_ms_saved': round(skipped * parse.total / parse.count, 2) if parse.count else None,
+            'histograms': {stage: histogram.as_dict() for stage, histogram in self.histograms.items()},
+        }
@@ -0,0 +1,79 @@
+from homeassistant.components.number import NumberEntity, NumberEntityDescription, NumberMode
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from dataclasses import dataclass
+import logging
+from . import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+SETPOINT_ENDPOINT = "PAGE70.XML"
+
+
+@dataclass(frozen=True, kw_only=True)
+class NeoreNumberEntityDescription(NumberEntityDescription):
+    """Describes a PLC register that can be set."""
+
+    register: str
+    endpoint: str = SETPOINT_ENDPOINT
+
+
+# Setpoints that can be changed. The step follows the precision the page
+# shows the register with, so the value read back confirms the write.
+SETPOINTS = (
+    NeoreNumberEntityDescription(
+        key="required_temperature",
+        name="Required Temperature",
+        register="__R7312_REAL_.0f",
+        native_unit_of_measurement="°C",
+        native_min_value=10,
+        native_max_value=30,
+        native_step=1,
+        mode=NumberMode.BOX,
+    ),
+)
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Setup the Neore number platform."""
+    if DOMAIN not in hass.data:
+        _LOGGER.error("Neore domain data not found in hass.data")
+        return
+
+    async_add_entities(
+        NeoreSetpoint(coordinator, description)
+        for coordinator in hass.data[DOMAIN].values()
+        for description in SETPOINTS
+    )
+
+
+class NeoreSetpoint(CoordinatorEntity, NumberEntity):
+    """A register that is shown like a sensor and can be set from Home Assistant.
+
+    Changes are written through the data manager's write queue, so rapid
+    changes go out as one request, and the state only moves once the PLC
+    has confirmed the new value.
+    """
+
+    entity_description: NeoreNumberEntityDescription
+
+    def __init__(self, coordinator, description):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_name = f"{coordinator.device_name} {description.name}"
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_{description.register}"
+
+    async def async_added_to_hass(self):
+        """Keep our register polled while the entity exists."""
+        await super().async_added_to_hass()
+        description = self.entity_description
+        self.async_on_remove(self.coordinator.async_subscribe(description.register, description.endpoint))
+
+    @property
+    def native_value(self):
+        data = self.coordinator.data
+        return None if data is None else data.get(self.entity_description.register)
+
+    async def async_set_native_value(self, value):
+        """Write the value to the PLC; returns once it has been read back."""
+        description = self.entity_description
+        await self.coordinator.async_write(description.register, description.endpoint, value)
@@ -0,0 +1,60 @@
+import logging
+from typing import NamedTuple
+from xml.parsers import expat
+
+_LOGGER = logging.getLogger(__name__)
+
+INPUT_TAG = 'INPUT'
+
+
+class ParseStats(NamedTuple):
+    """How much of a page a parse had to look at."""
+
+    scanned: int  # INPUT elements seen
+    kept: int  # INPUT elements whose value was extracted
+    complete: bool  # True if parsing stopped early because everything was found
+
+
+class _AllFound(Exception):
+    """Raised from the expat handler to stop parsing once every register is seen."""
+
+
+def extract_registers(content, wanted=None):
+    """Stream the INPUT elements of a SoftPLC page and return the wanted values.
+
+    No element tree is built: expat hands each start tag to a handler that
+    only keeps NAME/VALUE pairs whose name is in ``wanted``, and parsing
+    stops as soon as all of them have been seen. With ``wanted=None`` every
+    INPUT is kept.
+
+    Returns a ``(values, stats)`` tuple. Raises ``expat.ExpatError`` on
+    malformed XML.
+    """
+    values = {}
+    if wanted is not None and not wanted:
+        return values, ParseStats(0, 0, True)
+    scanned = 0
+    remaining = len(wanted) if wanted is not None else -1
+
+    def start_element(tag, attrs):
+        nonlocal scanned, remaining
+        if tag != INPUT_TAG:
+            return
+        scanned += 1
+        name = attrs.get('NAME')
+        if wanted is not None:
+            if name not in wanted or name in values:
+                return
+            remaining -= 1
+        values[name] = attrs.get('VALUE')
+        if remaining == 0:
+            raise _AllFound
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    complete = False
+    try:
+        parser.Parse(content, True)
+    except _AllFound:
+        complete = True
+    return values, ParseStats(scanned, len(values), complete)
@@ -1,90 +1,438 @@
+import asyncio
+import hashlib
 import logging
+import math
 import time
-import requests
-import xml.etree.ElementTree as ET
-from threading import Thread, Lock
-from .authentication import NeoreSessionManager
+from xml.parsers import expat
+from .authentication import NeoreSessionManager, NeoreError
+from .catalog import DISCOVERY_PAGES, async_discover
+from .derived import DerivedMetrics
+from .energy import EnergyIntegrator
+from .hourly import HourlyAggregator
+from .metrics import PollMetrics
+from .page_parser import extract_registers
+from .registers import RegisterValue, Snapshot, decode_value
+from .rolling import RollingWindow
+from .scheduler import MIN_POLL_INTERVAL, PollScheduler
+from .writer import WriteQueue
 
 _LOGGER = logging.getLogger(__name__)
-ENDPOINTS = ['PAGE70.XML']
 COOLDOWN_TIME = 30
+# Poll interval per page in seconds; PAGE69 only carries slow counters
+PAGE_INTERVALS = {
+    'PAGE70.XML': COOLDOWN_TIME,
+    'PAGE69.XML': 600,
+}
+# A page counts as active, and is polled faster, once any subscribed value
+# moves by more than this fraction of its size (at least of 1.0)
+ACTIVITY_THRESHOLD = 0.02
 
 class NeoreDataManager:
-    _instance = None
-    _lock = Lock()
-
-    def __new__(cls, *args, **kwargs):
-        with cls._lock:
-            if not cls._instance:
-                cls._instance = super(NeoreDataManager, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self, plc_url, username, password):
-        # Only initialize once - use instance variable
-        with self._lock:
-            # Check if already initialized using getattr with default
-            if getattr(self, '_initialized', False):
-                # Log if trying to reinitialize with different parameters
-                if (self._plc_url != plc_url or 
-                    self._username != username or 
-                    self._password != password):
-                    _LOGGER.warning(
-                        "NeoreDataManager already initialized with different parameters. "
-                        "Using existing instance with original parameters."
-                    )
-                return
-                
-            self._plc_url = plc_url
-            self._username = username
-            self._password = password
-            self._data_map = {}  # Map to store data
-            self._current_endpoint_idx = 0
-            self._update_thread = Thread(target=self._update_data)
-            self._update_thread.daemon = True
-            self._update_thread.start()
-            self._initialized = True
-            _LOGGER.info("NeoreDataManager initialized and update thread started")
-
-    def _update_data(self):
-        _LOGGER.info("NeoreDataManager update thread started")
-        while True:
-            endpoint = ENDPOINTS[self._current_endpoint_idx]
-            cookie = self._login()
-
-            if cookie is not None:
-                base_url = self._plc_url if self._plc_url.endswith('/') else self._plc_url + '/'
-                response = requests.get(f"{base_url}{endpoint}", cookies={'SoftPLC': cookie})
-
-                if response.status_code == 200:
-                    self._process_response(response)
-                    _LOGGER.debug("Successfully fetched and processed data from %s", endpoint)
-                else:
-                    _LOGGER.error("Failed to fetch data from endpoint %s. Status code: %s \n %s", endpoint, response.status_code, response.text)
-                self._current_endpoint_idx = (self._current_endpoint_idx + 1) % len(ENDPOINTS)
+    """Fetch, decode and publish the registers of one PLC.
+
+    Every PLC gets its own manager with its own authenticated session, so
+    several heat pumps can be polled side by side.
+    """
+
+    def __init__(self, session, plc_url, username, password, page_intervals=None, archive=None):
+        self._plc_url = plc_url
+        self._username = username
+        self._password = password
+        # Stage timings and transfer sizes of the poll cycles
+        self.metrics = PollMetrics()
+        # One authenticated keep-alive session for the lifetime of the manager
+        self._session_manager = NeoreSessionManager(plc_url, username, password, session, self.metrics)
+        self._write_queue = WriteQueue(self._session_manager)
+        # Latest published snapshot; replaced as a whole, never mutated
+        self._snapshot = Snapshot.EMPTY
+        # Metrics calculated once per snapshot and published in it
+        self.derived = DerivedMetrics()
+        self.parse_stats = {}  # page -> ParseStats of its last parse
+        # page -> (body digest, registers extracted, response validators,
+        # registers published) of its last parse
+        self._parsed_pages = {}
+        # True if the last cycle parsed new content of a page or wrote to one
+        self.last_cycle_changed = False
+        # page -> task of the fetch in progress, shared by concurrent cycles
+        self._inflight = {}
+        # (key, window) -> [RollingWindow, page, source, reference count]
+        self._windows = {}
+        # key -> [EnergyIntegrator, page, source]
+        self._integrators = {}
+        # key -> [HourlyAggregator, page, source]
+        self._hourly = {}
+        # Energy totals loaded from storage, picked up when an integrator starts
+        self._restored_energy = {}
+        # (register, page) subscriptions held for a restored snapshot
+        self._restored_subscriptions = set()
+        self.scheduler = PollScheduler({**PAGE_INTERVALS, **(page_intervals or {})}, COOLDOWN_TIME)
+        # Optional SnapshotArchive that gets every register of its pages
+        self.archive = archive
+        _LOGGER.info("NeoreDataManager initialized for %s", plc_url)
+
+    def subscribe(self, register, page):
+        """Start polling the page that carries a register.
+
+        Returns True if the page has to be fetched for this register.
+        """
+        if (register, page) in self._restored_subscriptions:
+            # Take over the subscription held for the restored snapshot
+            self._restored_subscriptions.discard((register, page))
+            return False
+        # Registers already read along with others on their page need no fetch
+        return self.scheduler.subscribe(register, page, fetch=register not in self._snapshot)
+
+    def unsubscribe(self, register, page):
+        """Stop polling a register; its page stops once nothing needs it."""
+        self.scheduler.unsubscribe(register, page)
+
+    def track(self, key, window_seconds, page, source=None):
+        """Keep a rolling window of a register or derived value and return it.
+
+        ``source`` defaults to the register or derived metric named ``key``;
+        a callable taking the snapshot can also be given. The window is fed
+        every time ``page`` is fetched and is shared by everyone tracking
+        the same key and window length.
+        """
+        entry = self._windows.get((key, window_seconds))
+        if entry is None:
+            # Room for every sample of the window at the page's poll rate
+            spacing = max(self.scheduler.min_interval(page), MIN_POLL_INTERVAL)
+            capacity = math.ceil(window_seconds / spacing) + 2
+            entry = [RollingWindow(window_seconds, capacity), page, source or key, 0]
+            self._windows[(key, window_seconds)] = entry
+        entry[3] += 1
+        return entry[0]
+
+    def untrack(self, key, window_seconds):
+        """Release a rolling window obtained from track()."""
+        entry = self._windows.get((key, window_seconds))
+        if entry is None:
+            return
+        entry[3] -= 1
+        if entry[3] <= 0:
+            del self._windows[(key, window_seconds)]
+
+    def integrate(self, key, page, source=None):
+        """Integrate a power register or derived value (kW) into kWh and return the integrator.
+
+        ``source`` works as for track(). The total continues from the value
+        restored with restore_energy(), if any.
+        """
+        entry = self._integrators.get(key)
+        if entry is None:
+            entry = [EnergyIntegrator(self._restored_energy.get(key, 0.0)), page, source or key]
+            self._integrators[key] = entry
+        return entry[0]
+
+    def aggregate_hourly(self, key, page, source=None):
+        """Aggregate a register or derived value per clock hour and return the aggregator.
+
+        ``source`` works as for track(); it is fed after the energy
+        integrators, so a callable can read their totals.
+        """
+        entry = self._hourly.get(key)
+        if entry is None:
+            entry = [HourlyAggregator(), page, source or key]
+            self._hourly[key] = entry
+        return entry[0]
+
+    def energy_totals(self):
+        """Return the energy totals to persist, including restored ones not in use."""
+        return {**self._restored_energy, **{key: entry[0].total for key, entry in self._integrators.items()}}
+
+    def restore_energy(self, totals):
+        """Continue energy totals saved by a previous run."""
+        self._restored_energy = dict(totals)
+        for key, entry in self._integrators.items():
+            entry[0].total = max(entry[0].total, self._restored_energy.get(key, 0.0))
+
+    def _feed_series(self, pages, snapshot):
+        """Add this cycle's samples to the rolling windows and integrators of the fetched pages."""
+        consumers = [(window, page, source) for window, page, source, _ in self._windows.values()]
+        consumers.extend(self._integrators.values())
+        consumers.extend(self._hourly.values())
+        for consumer, page, source in consumers:
+            if page not in pages:
+                continue
+            if callable(source):
+                value = source(snapshot)
+                fetched_at = snapshot.updated_at
             else:
-                _LOGGER.warning("Login failed, will retry in %d seconds", COOLDOWN_TIME)
-            time.sleep(COOLDOWN_TIME)
-
-    def _login(self):
-        session_manager = NeoreSessionManager(self._plc_url, self._username, self._password)
-        cookie = session_manager.login()
-        return cookie
-
-    def _process_response(self, response):
-        root = ET.fromstring(response.content)
-        count = 0
-        for input_element in root.findall('.//INPUT'):
-            input_name = input_element.get('NAME')
-            input_value = input_element.get('VALUE')
-            self._data_map[input_name] = input_value
-            count += 1
-        _LOGGER.debug("Processed %d input elements from response", count)
+                reading = snapshot.reading(source)
+                if reading is None:
+                    continue
+                value, fetched_at = reading
+            if isinstance(value, (int, float)):
+                consumer.add(float(value), fetched_at)
+
+    def snapshot_pages(self):
+        """Return the subscribed readings of the snapshot by page, for persisting."""
+        return {
+            page: {
+                name: list(self._snapshot.reading(name))
+                for name in self.scheduler.wanted(page)
+                if name in self._snapshot
+            }
+            for page in self.scheduler.pages
+        }
+
+    def restore_snapshot(self, pages, updated_at):
+        """Start from readings saved by a previous run, stale until fetched again.
+
+        ``pages`` is what snapshot_pages() returned. The restored registers
+        are subscribed, so their pages can be fetched before any entity
+        exists; entities take these subscriptions over, and the ones left
+        are dropped by release_restored().
+        """
+        readings = {}
+        for page, page_readings in pages.items():
+            for name, (value, fetched_at) in page_readings.items():
+                readings[name] = RegisterValue(value, fetched_at)
+                self.scheduler.subscribe(name, page)
+                self._restored_subscriptions.add((name, page))
+        readings.update(self.derived.evaluate(readings, updated_at))
+        self._snapshot = Snapshot(readings, updated_at, stale=True)
+
+    def release_restored(self):
+        """Drop the restored subscriptions that no entity took over."""
+        for name, page in self._restored_subscriptions:
+            self.scheduler.unsubscribe(name, page)
+        self._restored_subscriptions = set()
+
+    @property
+    def snapshot(self):
+        """Return the latest published snapshot."""
+        return self._snapshot
+
+    async def async_update(self):
+        """Fetch the pages that are due side by side and publish one new snapshot.
+
+        Every page of the cycle is stamped with the time the cycle started,
+        so values combined across pages are from the same moment, and the
+        cycle takes as long as its slowest page. A page that fails is
+        retried after its own backoff while the other pages are still
+        published; only when every due page failed is the first error raised.
+        """
+        readings = {}
+        fetched = []
+        changed = False
+        cycle_time = time.time()
+        start = time.perf_counter()
+        self.metrics.begin_cycle()
+        due = self.scheduler.due_pages()
+        results = []
+        try:
+            results = await asyncio.gather(
+                *(self._async_fetch(endpoint, cycle_time) for endpoint in due), return_exceptions=True
+            )
+        finally:
+            for endpoint, result in zip(due, results):
+                if isinstance(result, BaseException):
+                    continue
+                page_readings, page_changed, owner = result
+                readings.update(page_readings)
+                changed = changed or page_changed
+                if owner:
+                    # Only one caller feeds the series, so no sample is added twice
+                    fetched.append(endpoint)
+            self._snapshot = self._snapshot.merge(readings, cycle_time, self.derived.evaluate)
+            if fetched:
+                self._feed_series(fetched, self._snapshot)
+            self.metrics.end_cycle(time.perf_counter() - start)
+            # A cycle that fetched nothing, or only unchanged pages, changed nothing
+            self.last_cycle_changed = changed
+        errors = [(endpoint, result) for endpoint, result in zip(due, results) if isinstance(result, BaseException)]
+        for _, error in errors:
+            if not isinstance(error, NeoreError):
+                raise error
+        if errors and len(errors) == len(due):
+            raise errors[0][1]
+        for endpoint, error in errors:
+            log = _LOGGER.warning if self.scheduler.failures(endpoint) == 1 else _LOGGER.debug
+            log("Could not poll %s, publishing the other pages: %s", endpoint, error)
+        return self._snapshot
+
+    async def _async_fetch(self, endpoint, fetched_at):
+        """Fetch a page, or join its fetch already in flight.
+
+        Returns its readings, whether it changed and whether this call
+        started the fetch.
+        """
+        task = self._inflight.get(endpoint)
+        owner = task is None
+        if owner:
+            task = asyncio.ensure_future(self._async_poll_page(endpoint, fetched_at))
+            self._inflight[endpoint] = task
+            task.add_done_callback(lambda _: self._inflight.pop(endpoint, None))
+        else:
+            _LOGGER.debug("Joining the fetch of %s that is already in flight", endpoint)
+        # Shielded so a cancelled caller does not cancel the others' fetch
+        try:
+            page_readings, page_changed = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            # The fetch itself was cancelled by async_close()
+            raise NeoreError(f"Fetch of {endpoint} was cancelled") from None
+        return page_readings, page_changed, owner
+
+    async def _async_poll_page(self, endpoint, fetched_at):
+        """Poll one page and schedule its next poll, or its retry if it failed."""
+        try:
+            page_readings, changed = await self._async_read_page(endpoint, fetched_at)
+        except NeoreError:
+            self.scheduler.mark_failed(endpoint)
+            raise
+        self.scheduler.record_activity(endpoint, self._is_active(page_readings))
+        self.scheduler.mark_polled(endpoint)
+        _LOGGER.debug("Successfully fetched and processed data from %s", endpoint)
+        return page_readings, changed
+
+    async def _async_read_page(self, endpoint, fetched_at):
+        """Fetch one page; return its readings, stamped ``fetched_at``, and whether its content changed."""
+        wanted = self.scheduler.wanted(endpoint)
+        # Archived pages are parsed in full; None extracts every register
+        extract = None if self.archive is not None and endpoint in self.archive.pages else wanted
+        parsed = self._parsed_pages.get(endpoint)
+        # Validators and digests only stand for the registers extracted with
+        # them, and an unchanged page only restamps the registers it published
+        reusable = parsed is not None and parsed[1] == extract and wanted <= parsed[3]
+        content, validators = await self._session_manager.async_get_conditional(
+            endpoint, parsed[2] if reusable else None
+        )
+
+        changed = False
+        if content is None:
+            self.metrics.count_unchanged('not_modified')
+            page_readings = self._restamp(wanted, fetched_at)
+        else:
+            digest = hashlib.blake2b(content, digest_size=16).digest()
+            if reusable and parsed[0] == digest:
+                self.metrics.count_unchanged('identical')
+                page_readings = self._restamp(wanted, fetched_at)
+                self._parsed_pages[endpoint] = (digest, extract, validators, wanted)
+            else:
+                try:
+                    page_readings = self._process_response(endpoint, content, extract, fetched_at)
+                except expat.ExpatError as e:
+                    raise NeoreError(f"Invalid XML received from endpoint {endpoint}: {e}") from e
+                self._parsed_pages[endpoint] = (digest, extract, validators, wanted)
+                changed = True
+                if extract is None:
+                    self._archive_page(page_readings)
+                    page_readings = {name: page_readings[name] for name in wanted if name in page_readings}
+        return page_readings, changed
+
+    async def async_write(self, register, page, value):
+        """Set a register on the PLC and publish the value read back.
+
+        Writes are batched per page with others made at the same time; see
+        WriteQueue. Returns the new snapshot once the PLC confirmed it.
+        """
+        readings = await self._write_queue.async_write(page, register, value)
+        # The page changed under its last parse; the next poll parses it in
+        # full instead of revalidating or reusing that parse
+        self._parsed_pages.pop(page, None)
+        self._snapshot = self._snapshot.merge(readings, time.time(), self.derived.evaluate)
+        self.last_cycle_changed = True
+        return self._snapshot
+
+    def request_refresh(self, pages=None):
+        """Make pages due for an on-demand refresh; see PollScheduler.request.
+
+        ``pages`` defaults to every polled page. Returns the seconds until
+        all of them are due, or None if none of them is polled.
+        """
+        pages = self.scheduler.pages if pages is None else pages
+        delays = [delay for delay in map(self.scheduler.request, pages) if delay is not None]
+        return max(delays, default=None)
+
+    def _restamp(self, registers, fetched_at):
+        """Return the current readings of an unchanged page as fetched at ``fetched_at``.
+
+        The values need no parsing, but rolling windows and energy
+        integration still have to see a sample for this cycle.
+        """
+        readings = {}
+        for name in registers:
+            reading = self._snapshot.reading(name)
+            if reading is not None:
+                readings[name] = RegisterValue(reading.value, fetched_at)
+        return readings
+
+    def _is_active(self, readings):
+        """Return True if any reading moved noticeably since the last snapshot."""
+        for name, reading in readings.items():
+            previous = self._snapshot.get(name)
+            value = reading.value
+            if previous is None or value is None:
+                continue
+            if isinstance(value, float) and isinstance(previous, float):
+                if abs(value - previous) > ACTIVITY_THRESHOLD * max(abs(previous), 1.0):
+                    return True
+            elif value != previous:
+                return True
+        return False
+
+    def _archive_page(self, readings):
+        """Queue every register of a freshly parsed page for the archive.
+
+        An unchanged page adds nothing: its values hold until the next record.
+        """
+        if readings:
+            fetched_at = next(iter(readings.values())).fetched_at
+            self.archive.append(fetched_at, {name: reading.value for name, reading in readings.items()})
+
+    def _process_response(self, endpoint, content, wanted, fetched_at):
+        """Return the typed readings of the ``wanted`` registers on a page, or of all for None."""
+        start = time.perf_counter()
+        values, stats = extract_registers(content, wanted)
+        self.metrics.observe('parse', time.perf_counter() - start)
+        self.parse_stats[endpoint] = stats
+        _LOGGER.debug(
+            "Scanned %d input elements from %s, kept %d%s",
+            stats.scanned, endpoint, stats.kept, " (stopped early)" if stats.complete else "",
+        )
+        # Decode once here so consumers never parse strings again
+        return {name: RegisterValue(decode_value(name, raw), fetched_at) for name, raw in values.items()}
+
+    async def async_discover_catalog(self, cached=None, pages=DISCOVERY_PAGES):
+        """Enumerate the registers on the PLC; see ``catalog.async_discover``."""
+        try:
+            return await async_discover(self._session_manager, pages, cached)
+        except expat.ExpatError as e:
+            raise NeoreError(f"Invalid XML received during register discovery: {e}") from e
+
+    async def async_close(self):
+        """Cancel the page fetches and writes in flight, for unload or shutdown.
+
+        Callers waiting on a fetch or a write get a NeoreError. The session
+        is left to whoever created it.
+        """
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await self._write_queue.async_close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def login_count(self):
+        """Return how often the manager logged in to the PLC."""
+        return self._session_manager.login_count
+
+    def data_age(self, now=None):
+        """Return seconds since the snapshot was last updated, or None."""
+        if self._snapshot.updated_at is None:
+            return None
+        return (time.time() if now is None else now) - self._snapshot.updated_at
 
     def get_sensor_data(self, input_name):
-        return self._data_map.get(input_name)
+        return self._snapshot.get(input_name)
 
 # Example usage:
-# manager = NeoreDataManager('http://192.168.0.152', 'your_username', 'your_password')
+# manager = NeoreDataManager(create_session(), 'http://192.168.0.152', 'your_username', 'your_password')
+# snapshot = await manager.async_update()
 
 # To get data for a specific input_name:
 # data = manager.get_sensor_data('__R7195_REAL_.1f')
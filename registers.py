@@ -0,0 +1,134 @@
+import logging
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, NamedTuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# SoftPLC register names look like __R7195_REAL_.1f or __R15676_UDINT_u:
+# address, IEC data type and the printf-style format the page renders with
+REGISTER_NAME = re.compile(r'^__R(?P<address>\d+)_(?P<type>[A-Z]+)_(?P<format>.*)$')
+PRECISION_FORMAT = re.compile(r'^\.(?P<precision>\d+)[fe]$')
+
+FLOAT_TYPES = frozenset(('REAL', 'LREAL'))
+INT_TYPES = frozenset((
+    'SINT', 'INT', 'DINT', 'LINT', 'USINT', 'UINT', 'UDINT', 'ULINT', 'BYTE', 'WORD', 'DWORD', 'LWORD',
+))
+BOOL_TYPES = frozenset(('BOOL',))
+
+
+class RegisterSpec(NamedTuple):
+    """What a register name says about its value."""
+
+    address: int | None
+    data_type: str | None
+    precision: int | None
+    converter: Any  # callable turning the raw string into a typed value
+
+
+def _to_bool(raw):
+    return raw.strip().upper() in ('1', 'TRUE', 'ON')
+
+
+@lru_cache(maxsize=None)
+def decode_register_name(name):
+    """Decode the type and precision suffix of a register name once."""
+    match = REGISTER_NAME.match(name)
+    if not match:
+        return RegisterSpec(None, None, None, str)
+    data_type = match['type']
+    fmt = match['format']
+    if data_type in FLOAT_TYPES:
+        precision_match = PRECISION_FORMAT.match(fmt)
+        precision = int(precision_match['precision']) if precision_match else None
+        converter = float
+    elif data_type in INT_TYPES:
+        precision = 0
+        converter = int
+    elif data_type in BOOL_TYPES:
+        precision = None
+        converter = _to_bool
+    else:
+        precision = None
+        converter = str
+    return RegisterSpec(int(match['address']), data_type, precision, converter)
+
+
+def decode_value(name, raw):
+    """Return the typed value of a raw register string, or None if it is unreadable."""
+    if raw is None:
+        return None
+    try:
+        return decode_register_name(name).converter(raw)
+    except ValueError:
+        _LOGGER.debug("Could not decode %s value %r", name, raw)
+        return None
+
+
+def encode_value(name, value):
+    """Return the string the PLC expects when a register is set to ``value``."""
+    spec = decode_register_name(name)
+    if spec.data_type in FLOAT_TYPES:
+        return f"{float(value):.{spec.precision}f}" if spec.precision is not None else repr(float(value))
+    if spec.data_type in INT_TYPES:
+        return str(round(value))
+    if spec.data_type in BOOL_TYPES:
+        return '1' if value else '0'
+    return str(value)
+
+
+class RegisterValue(NamedTuple):
+    """A typed register value and the wall-clock time it was fetched."""
+
+    value: Any
+    fetched_at: float
+
+
+class Snapshot(Mapping):
+    """Immutable set of typed register values.
+
+    Indexing returns the typed value; ``reading()`` also returns when it was
+    fetched. A new snapshot is built for every poll cycle and published with
+    a single reference swap, so readers never see a mix of two cycles.
+    A snapshot restored from a previous run is ``stale`` until the next
+    successful fetch merges into it.
+    """
+
+    __slots__ = ('_readings', 'updated_at', 'stale')
+
+    def __init__(self, readings=None, updated_at=None, stale=False):
+        self._readings = dict(readings or {})
+        self.updated_at = updated_at
+        self.stale = stale
+
+    def __getitem__(self, name):
+        return self._readings[name].value
+
+    def __iter__(self):
+        return iter(self._readings)
+
+    def __len__(self):
+        return len(self._readings)
+
+    def reading(self, name):
+        """Return the RegisterValue of a register, or None if it is unknown."""
+        return self._readings.get(name)
+
+    def merge(self, readings, updated_at, derive=None):
+        """Return a new snapshot with the given readings replacing older ones.
+
+        ``derive`` is called with the merged ``{name: RegisterValue}`` and
+        the time, and returns readings calculated from them, such as
+        DerivedMetrics.evaluate; those are part of the same snapshot.
+        """
+        if not readings:
+            return self
+        merged = dict(self._readings)
+        merged.update(readings)
+        if derive is not None:
+            merged.update(derive(merged, updated_at))
+        return Snapshot(merged, updated_at)
+
+
+Snapshot.EMPTY = Snapshot()
@@ -0,0 +1,126 @@
+import math
+from array import array
+from collections import deque
+
+
+class RollingWindow:
+    """Time-bounded ring buffer of samples with incrementally updated statistics.
+
+    Samples live in two preallocated ``array('d')`` columns. Adding a sample
+    evicts the ones that fell out of the window (or were overwritten when the
+    buffer is full) and updates the running sum, the step-wise time integral
+    and the monotonic min/max queues, so every statistic is O(1) per sample.
+    """
+
+    __slots__ = (
+        'window', 'capacity', '_values', '_times', '_start', '_size', '_seq',
+        '_sum', '_area', '_min_queue', '_max_queue',
+    )
+
+    def __init__(self, window, capacity):
+        self.window = window
+        self.capacity = capacity
+        self._values = array('d', bytes(8 * capacity))
+        self._times = array('d', bytes(8 * capacity))
+        self._start = 0  # sequence number of the oldest sample
+        self._size = 0
+        self._seq = 0  # sequence number the next sample gets
+        self._sum = 0.0
+        self._area = 0.0  # integral of the step function between first and last sample
+        self._min_queue = deque()  # sequence numbers with increasing values
+        self._max_queue = deque()  # sequence numbers with decreasing values
+
+    def __len__(self):
+        return self._size
+
+    def _value(self, seq):
+        return self._values[seq % self.capacity]
+
+    def _time(self, seq):
+        return self._times[seq % self.capacity]
+
+    def add(self, value, timestamp):
+        """Append a sample; samples older than the window are dropped."""
+        if value is None or math.isnan(value):
+            return
+        if self._size and timestamp < self._time(self._seq - 1):
+            return  # out of order, the step integral would go backwards
+        if self._size == self.capacity:
+            self._evict()
+        if self._size:
+            previous = self._seq - 1
+            self._area += self._value(previous) * (timestamp - self._time(previous))
+
+        seq = self._seq
+        self._values[seq % self.capacity] = value
+        self._times[seq % self.capacity] = timestamp
+        self._seq += 1
+        self._size += 1
+        self._sum += value
+
+        while self._min_queue and self._value(self._min_queue[-1]) >= value:
+            self._min_queue.pop()
+        self._min_queue.append(seq)
+        while self._max_queue and self._value(self._max_queue[-1]) <= value:
+            self._max_queue.pop()
+        self._max_queue.append(seq)
+
+        cutoff = timestamp - self.window
+        while self._size > 1 and self._time(self._start) < cutoff:
+            self._evict()
+
+        # Re-sum once per lap so float error from add/subtract cannot build up
+        if seq % self.capacity == self.capacity - 1:
+            self._resync()
+
+    def _evict(self):
+        oldest = self._start
+        if self._size > 1:
+            self._area -= self._value(oldest) * (self._time(oldest + 1) - self._time(oldest))
+        self._sum -= self._value(oldest)
+        self._start += 1
+        self._size -= 1
+        if self._min_queue and self._min_queue[0] == oldest:
+            self._min_queue.popleft()
+        if self._max_queue and self._max_queue[0] == oldest:
+            self._max_queue.popleft()
+
+    def _resync(self):
+        seqs = range(self._start, self._seq)
+        self._sum = math.fsum(self._value(seq) for seq in seqs)
+        self._area = math.fsum(
+            self._value(seq) * (self._time(seq + 1) - self._time(seq)) for seq in seqs[:-1]
+        )
+
+    @property
+    def last(self):
+        return self._value(self._seq - 1) if self._size else None
+
+    @property
+    def mean(self):
+        return self._sum / self._size if self._size else None
+
+    @property
+    def min(self):
+        return self._value(self._min_queue[0]) if self._size else None
+
+    @property
+    def max(self):
+        return self._value(self._max_queue[0]) if self._size else None
+
+    @property
+    def span(self):
+        """Seconds between the oldest and the newest sample."""
+        if not self._size:
+            return 0.0
+        return self._time(self._seq - 1) - self._time(self._start)
+
+    @property
+    def time_weighted_mean(self):
+        """Mean with every sample weighted by how long it held."""
+        if not self._size:
+            return None
+        span = self.span
+        if span <= 0:
+            return self.last
+        return self._area / span
@@ -0,0 +1,169 @@
+import logging
+import random
+import time
+from collections import Counter
+
+_LOGGER = logging.getLogger(__name__)
+
+# While values move the interval shrinks towards FAST_FACTOR × the configured
+# interval; while they sit still it grows towards SLOW_FACTOR × it
+FAST_FACTOR = 1 / 3
+SLOW_FACTOR = 2
+SPEED_UP = 0.5
+SLOW_DOWN = 1.25
+
+# Retry delays while a page cannot be polled
+MAX_BACKOFF = 15 * 60
+
+# Never schedule polls closer together than this, even if pages are overdue
+MIN_POLL_INTERVAL = 1
+
+# On-demand refreshes never poll a page more often than this
+MIN_REFRESH_SPACING = 5
+
+
+def backoff_delay(failures, base):
+    """Return a jittered exponential retry delay after consecutive failures.
+
+    The delay doubles per failure up to MAX_BACKOFF and is drawn from its
+    upper half, so several heat pumps that failed together do not retry in
+    lockstep.
+    """
+    delay = min(MAX_BACKOFF, base * 2 ** max(0, failures - 1))
+    return random.uniform(delay / 2, delay)
+
+
+class PollScheduler:
+    """Decide which PLC pages are due, based on the registers entities use.
+
+    Every subscribed register is mapped to the page that carries it. A page
+    is only polled while at least one register on it is subscribed, and each
+    page runs on its own interval. The interval adapts: it shortens while the
+    page's values are changing and lengthens while they are idle.
+    """
+
+    def __init__(self, intervals, default_interval):
+        self._intervals = dict(intervals)
+        self._default_interval = default_interval
+        self._subscriptions = {}  # page -> Counter of register names
+        self._next_due = {}  # page -> monotonic time the page is due
+        self._current = {}  # page -> adapted interval in seconds
+        self._polled_at = {}  # page -> monotonic time of the last poll
+        self._failures = {}  # page -> consecutive failed polls
+
+    def base_interval(self, page):
+        """Return the configured poll interval of a page in seconds."""
+        return self._intervals.get(page, self._default_interval)
+
+    def min_interval(self, page):
+        """Return the shortest interval the page adapts down to."""
+        return self.base_interval(page) * FAST_FACTOR
+
+    def interval(self, page):
+        """Return the current, adapted poll interval of a page in seconds."""
+        return self._current.get(page, self.base_interval(page))
+
+    def record_activity(self, page, active):
+        """Adapt the interval of a page to whether its values just changed."""
+        base = self.base_interval(page)
+        current = self.interval(page)
+        if active:
+            current = max(base * FAST_FACTOR, current * SPEED_UP)
+        else:
+            current = min(base * SLOW_FACTOR, current * SLOW_DOWN)
+        self._current[page] = current
+
+    def subscribe(self, register, page, fetch=True):
+        """Register interest in a register; return True if its page is now due.
+
+        A page that was not polled before is due straight away, as is a page
+        that still has to be read for a new register (``fetch``).
+        """
+        registers = self._subscriptions.setdefault(page, Counter())
+        registers[register] += 1
+        if page not in self._next_due:
+            _LOGGER.debug("Started polling %s every %ss", page, self.interval(page))
+        elif registers[register] > 1 or not fetch:
+            return False
+        self._next_due[page] = time.monotonic()
+        return True
+
+    def unsubscribe(self, register, page):
+        """Drop interest in a register; stop polling its page once unused."""
+        registers = self._subscriptions.get(page)
+        if not registers:
+            return
+        registers[register] -= 1
+        if registers[register] <= 0:
+            del registers[register]
+        if not registers:
+            del self._subscriptions[page]
+            self._next_due.pop(page, None)
+            self._current.pop(page, None)
+            self._polled_at.pop(page, None)
+            self._failures.pop(page, None)
+            _LOGGER.debug("Stopped polling %s, no registers subscribed", page)
+
+    @property
+    def pages(self):
+        """Return the pages that currently have subscribers."""
+        return tuple(self._subscriptions)
+
+    def wanted(self, page):
+        """Return the registers subscribed on a page."""
+        return frozenset(self._subscriptions.get(page, ()))
+
+    def due_pages(self, now=None):
+        """Return the pages whose interval has elapsed."""
+        now = time.monotonic() if now is None else now
+        return [page for page, due in self._next_due.items() if due <= now]
+
+    def mark_polled(self, page, now=None):
+        """Schedule the next poll of a page one interval from now."""
+        if page not in self._next_due:
+            return
+        now = time.monotonic() if now is None else now
+        self._polled_at[page] = now
+        self._next_due[page] = now + self.interval(page)
+        self._failures.pop(page, None)
+
+    def mark_failed(self, page, now=None):
+        """Retry a page that could not be polled after a jittered backoff.
+
+        The backoff starts from the shorter of the page's interval and the
+        default one; other pages keep their own schedule. Returns the
+        consecutive failures of the page.
+        """
+        if page not in self._next_due:
+            return 0
+        now = time.monotonic() if now is None else now
+        failures = self._failures[page] = self._failures.get(page, 0) + 1
+        self._next_due[page] = now + backoff_delay(
+            failures, min(self.base_interval(page), self._default_interval)
+        )
+        return failures
+
+    def failures(self, page):
+        """Return how often polling a page failed in a row."""
+        return self._failures.get(page, 0)
+
+    def request(self, page, now=None):
+        """Bring the next poll of a page forward to now, on demand.
+
+        A page polled less than MIN_REFRESH_SPACING ago only becomes due
+        once that has passed. Returns the seconds until the page is due, or
+        None if it is not polled at all.
+        """
+        if page not in self._next_due:
+            return None
+        now = time.monotonic() if now is None else now
+        earliest = max(now, self._polled_at.get(page, 0.0) + MIN_REFRESH_SPACING)
+        self._next_due[page] = min(self._next_due[page], earliest)
+        return self._next_due[page] - now
+
+    def next_due_in(self, now=None):
+        """Return seconds until the next page is due, or None if nothing is subscribed."""
+        if not self._next_due:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self._next_due.values()) - now)
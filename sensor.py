@@ -1,60 +1,332 @@
-from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
-from datetime import timedelta
+from homeassistant.components.sensor import SensorEntity, SensorEntityDescription, SensorDeviceClass, SensorStateClass
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from collections.abc import Callable
+from dataclasses import dataclass
 import logging
+import time
 from . import DOMAIN
+from .deadband import Deadband
+from .derived import FLOW_FIELD, INPUT_TEMPERATURE_FIELD, OUTPUT_TEMPERATURE_FIELD, POWER_FIELD
+from .registers import FLOAT_TYPES, INT_TYPES
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(seconds=30)  # Set the desired update interval (e.g., 30 seconds)
-
 ENERGY_ENDPOINT = "PAGE70.XML"
+USAGE_ENDPOINT = "PAGE69.XML"
+
+
+@dataclass(frozen=True, kw_only=True)
+class NeoreSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor that shows one PLC register."""
+
+    register: str
+    endpoint: str = ENERGY_ENDPOINT
+    # Publish every change by default; widen this for noisy values
+    deadband: Deadband = Deadband()
+
+
+# Every register shown as a sensor. The unique ID is derived from the
+# register name, so entries must keep their register when edited.
+REGISTER_SENSORS = (
+    ### PAGE70.XML
+    NeoreSensorEntityDescription(
+        key="object_temperature",
+        name="Object Temperature",
+        register="__R7195_REAL_.1f",
+        native_unit_of_measurement="°C",
+        suggested_display_precision=1,
+        deadband=Deadband(absolute=0.1),
+    ),
+    NeoreSensorEntityDescription(
+        key="outdoor_temperature",
+        name="Outdoor Temperature",
+        register="__R7079_REAL_.0f",  # .1f is not available in PAGE70.XML
+        native_unit_of_measurement="°C",
+        suggested_display_precision=1,
+        deadband=Deadband(absolute=0.1),
+    ),
+    NeoreSensorEntityDescription(
+        key="circulation_percent",
+        name="Circulation Percent",
+        register="__R15173_REAL_.0f",
+        native_unit_of_measurement="%",
+        suggested_display_precision=0,
+        deadband=Deadband(absolute=1),
+    ),
+    NeoreSensorEntityDescription(
+        key="outdoor_unit_circulation_percent",
+        name="Outdoor Unit Circulation Percent",
+        register="__R7070_REAL_.0f",
+        native_unit_of_measurement="%",
+        suggested_display_precision=0,
+        deadband=Deadband(absolute=1),
+    ),
+    NeoreSensorEntityDescription(
+        key="output_temperature",
+        name="Output Temperature",
+        register=OUTPUT_TEMPERATURE_FIELD,
+        native_unit_of_measurement="°C",
+        suggested_display_precision=1,
+        deadband=Deadband(absolute=0.1),
+    ),
+    NeoreSensorEntityDescription(
+        key="input_temperature",
+        name="Input Temperature",
+        register=INPUT_TEMPERATURE_FIELD,
+        native_unit_of_measurement="°C",
+        suggested_display_precision=1,
+        deadband=Deadband(absolute=0.1),
+    ),
+    NeoreSensorEntityDescription(
+        key="required_temperature",
+        name="Required Temperature",
+        register="__R7312_REAL_.0f",
+        native_unit_of_measurement="°C",
+        suggested_display_precision=1,
+        deadband=Deadband(absolute=0.1),
+    ),
+    NeoreSensorEntityDescription(
+        key="water_flow",
+        name="Water Flow",
+        register=FLOW_FIELD,
+        native_unit_of_measurement="m³/h",
+        suggested_display_precision=2,
+        deadband=Deadband(absolute=0.01),
+    ),
+    NeoreSensorEntityDescription(
+        key="actual_power_usage",
+        name="Actual Power Usage",
+        register=POWER_FIELD,
+        native_unit_of_measurement="kW",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        deadband=Deadband(absolute=0.05),
+    ),
+    NeoreSensorEntityDescription(
+        key="supplied_power",
+        name="Supplied Power",
+        register="__R7091_REAL_.0f",
+        native_unit_of_measurement="kWh",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        suggested_display_precision=1,
+    ),
+    NeoreSensorEntityDescription(
+        key="water_pressure",
+        name="Water Pressure",
+        register="__R7297_REAL_.1f",
+        native_unit_of_measurement="Bar",
+        suggested_display_precision=1,
+        deadband=Deadband(absolute=0.05),
+    ),
+    ### PAGE69.XML, polled on its own, much slower interval
+    NeoreSensorEntityDescription(
+        key="hours_in_use",
+        name="Hours In Use",
+        register="__R15676_UDINT_u",
+        endpoint=USAGE_ENDPOINT,
+        native_unit_of_measurement="h",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        suggested_display_precision=0,
+    ),
+)
+
+# Metrics of DERIVED_METRICS shown as sensors; ``register`` names the
+# metric. The unique ID is derived from the key, as before the table.
+DERIVED_SENSORS = (
+    NeoreSensorEntityDescription(
+        key="temperature_delta",
+        name="Temperature Delta",
+        register="temperature_delta",
+        native_unit_of_measurement="°C",
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        deadband=Deadband(absolute=0.1),
+    ),
+    NeoreSensorEntityDescription(
+        key="thermal_power",
+        name="Thermal Power",
+        register="thermal_power",
+        native_unit_of_measurement="kW",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        deadband=Deadband(relative=0.02),
+    ),
+    NeoreSensorEntityDescription(
+        key="cop",
+        name="COP",
+        register="cop",
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        # COP swings with compressor modulation; only follow moves of 2 %
+        deadband=Deadband(relative=0.02),
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class NeoreDiagnosticEntityDescription(SensorEntityDescription):
+    """Describes a sensor that shows how the poll loop of a heat pump performs."""
+
+    value_fn: Callable
+
+    entity_category: EntityCategory = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
+
+
+def _stage_duration(stage):
+    return lambda coordinator: round(coordinator.data_manager.metrics.last_cycle[stage], 1)
+
+
+def _data_age(coordinator):
+    age = coordinator.data_manager.data_age()
+    return None if age is None else round(age)
+
+
+DIAGNOSTIC_SENSORS = (
+    *(
+        NeoreDiagnosticEntityDescription(
+            key=f"{stage}_duration",
+            name=f"{stage.capitalize()} Duration",
+            native_unit_of_measurement="ms",
+            device_class=SensorDeviceClass.DURATION,
+            suggested_display_precision=1,
+            value_fn=_stage_duration(stage),
+        )
+        for stage in ("login", "request", "parse", "publish")
+    ),
+    NeoreDiagnosticEntityDescription(
+        key="poll_duration",
+        name="Poll Duration",
+        native_unit_of_measurement="ms",
+        device_class=SensorDeviceClass.DURATION,
+        suggested_display_precision=1,
+        value_fn=_stage_duration("cycle"),
+    ),
+    NeoreDiagnosticEntityDescription(
+        key="response_size",
+        name="Response Size",
+        native_unit_of_measurement="B",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        value_fn=lambda coordinator: coordinator.data_manager.metrics.last_cycle_bytes,
+    ),
+    NeoreDiagnosticEntityDescription(
+        key="logins",
+        name="Logins",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.data_manager.login_count,
+    ),
+    NeoreDiagnosticEntityDescription(
+        key="consecutive_failures",
+        name="Consecutive Failures",
+        value_fn=lambda coordinator: coordinator.consecutive_failures,
+    ),
+    NeoreDiagnosticEntityDescription(
+        key="data_age",
+        name="Data Age",
+        native_unit_of_measurement="s",
+        device_class=SensorDeviceClass.DURATION,
+        value_fn=_data_age,
+    ),
+)
+
+
+def discovered_description(info):
+    """Describe a register found by discovery that has no REGISTER_SENSORS entry.
+
+    These sensors start disabled; enabling one is what makes its page polled.
+    """
+    numeric = info.data_type in FLOAT_TYPES or info.data_type in INT_TYPES
+    return NeoreSensorEntityDescription(
+        key=info.name,
+        name=f"Register {info.name.strip('_')}",
+        register=info.name,
+        endpoint=info.page,
+        state_class=SensorStateClass.MEASUREMENT if numeric else None,
+        suggested_display_precision=info.precision,
+        entity_registry_enabled_default=False,
+    )
+
 
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Setup the Neore sensor platform."""
     _LOGGER.info("Neore sensor platform setup called")
     _LOGGER.debug("Config: %s, Discovery info: %s", config, discovery_info)
     
-    # Retrieve data manager from hass.data
+    # Retrieve coordinator from hass.data
     if DOMAIN not in hass.data:
         _LOGGER.error("Neore domain data not found in hass.data")
         return
     
-    data_manager = hass.data[DOMAIN]
-    _LOGGER.info("Retrieved data manager from hass.data")
-
-    # Create sensor instances
-    sensors = [
-        NeoreObjectTemperature("Neore Object Temperature", data_manager, ENERGY_ENDPOINT, "__R7195_REAL_.1f"),
-        NeoreOutdoorTemperature("Neore Outdoor Temperature", data_manager, ENERGY_ENDPOINT, "__R7079_REAL_.0f"), # 1f is not available in PAGE70.XML
-        NeoreCirculationPercent("Neore Circulation Percent", data_manager, ENERGY_ENDPOINT, "__R15173_REAL_.0f"),
-        NeoreOutdoorUnitCirculationPercent("Neore Outdoor Unit Circulation Percent", data_manager, ENERGY_ENDPOINT, "__R7070_REAL_.0f"),
-        NeoreOutputTemperature("Neore Output Temperature", data_manager, ENERGY_ENDPOINT, "__R15104_REAL_.1f"),
-        NeoreInputTemperature("Neore Input Temperature", data_manager, ENERGY_ENDPOINT, "__R7096_REAL_.1f"),
-        NeoreRequiredTemperature("Neore Required Temperature", data_manager, ENERGY_ENDPOINT, "__R7312_REAL_.0f"),
-        NeoreWaterFlow("Neore Water Flow", data_manager, ENERGY_ENDPOINT, "__R7083_REAL_.1f"),
-        NeoreActualPowerUsage("Neore Actual Power Usage", data_manager, ENERGY_ENDPOINT, "__R7087_REAL_.1f"),
-        NeoreSuppliedPower("Neore Supplied Power", data_manager, ENERGY_ENDPOINT, "__R7091_REAL_.0f"),
-        NeoreWaterPressure("Neore Water Pressure", data_manager, ENERGY_ENDPOINT, "__R7297_REAL_.1f"),
-        # Calculated sensors for monitoring efficiency
-        NeoreTemperatureDelta("Neore Temperature Delta", data_manager, ENERGY_ENDPOINT, "__R15104_REAL_.1f", "__R7096_REAL_.1f"),
-        NeoreCOP("Neore COP", data_manager, ENERGY_ENDPOINT, "__R7083_REAL_.1f", "__R15104_REAL_.1f", "__R7096_REAL_.1f", "__R7087_REAL_.1f"),
-    ]
+    coordinators = hass.data[DOMAIN]
+    _LOGGER.info("Retrieved %d coordinator(s) from hass.data", len(coordinators))
+
+    sensors = []
+    for coordinator in coordinators.values():
+        sensors.extend(_create_sensors(coordinator))
+        if coordinator.discover:
+            # Every other register on the PLC, as disabled sensors
+            catalog = await coordinator.async_get_catalog()
+            known = {description.register for description in REGISTER_SENSORS}
+            sensors.extend(
+                NeoreRegisterSensor(coordinator, discovered_description(info))
+                for name, info in catalog.items()
+                if name not in known
+            )
     
     _LOGGER.info("Created %d sensor entities, adding to Home Assistant", len(sensors))
     async_add_entities(sensors)
     _LOGGER.info("Neore sensors added successfully")
 
 
+def _create_sensors(coordinator):
+    """Create the sensor instances of one heat pump."""
+    return [
+        *(NeoreRegisterSensor(coordinator, description) for description in REGISTER_SENSORS),
+        *(NeoreDiagnosticSensor(coordinator, description) for description in DIAGNOSTIC_SENSORS),
+        # Calculated sensors for monitoring efficiency
+        *(NeoreDerivedSensor(coordinator, description) for description in DERIVED_SENSORS),
+        # Rolling statistics kept in memory by the data manager
+        NeoreRollingCOP("COP 15 min", coordinator, ENERGY_ENDPOINT, 15 * 60),
+        NeoreRollingCOP("COP 1 h", coordinator, ENERGY_ENDPOINT, 60 * 60),
+        NeoreRollingSensor("Actual Power Usage 1 h Average", coordinator, ENERGY_ENDPOINT, POWER_FIELD, 60 * 60, "time_weighted_mean", "kW", 2),
+        NeoreRollingSensor("Output Temperature 1 h Min", coordinator, ENERGY_ENDPOINT, OUTPUT_TEMPERATURE_FIELD, 60 * 60, "min", "°C", 1),
+        NeoreRollingSensor("Output Temperature 1 h Max", coordinator, ENERGY_ENDPOINT, OUTPUT_TEMPERATURE_FIELD, 60 * 60, "max", "°C", 1),
+        # Energy integrated in process from every snapshot
+        NeoreEnergySensor("Thermal Energy", coordinator, ENERGY_ENDPOINT, "thermal", "thermal_power"),
+        NeoreEnergySensor("Electrical Energy", coordinator, ENERGY_ENDPOINT, "electrical", POWER_FIELD),
+        NeoreSCOP("SCOP", coordinator, ENERGY_ENDPOINT),
+    ]
+
+
+class NeoreBaseSensor(CoordinatorEntity, SensorEntity):
+    """Sensor fed by the coordinator; it never polls on its own.
+
+    States are only written when the value leaves the sensor's deadband,
+    or when the heartbeat is due.
+    """
+
+    # Publish every change by default; subclasses widen this for noisy values
+    _deadband = Deadband()
 
-class NeoreBaseSensor(SensorEntity):
-    def __init__(self, name, data_manager, endpoint, field_name):
-        self._name = name
+    def __init__(self, name, coordinator, endpoint, field_name):
+        super().__init__(coordinator)
+        # Names are prefixed with the heat pump's name, "Neore" by default
+        self._name = f"{coordinator.device_name} {name}"
         self._state = None
-        self._data_manager  = data_manager
         self._endpoint = endpoint
         self._field_name = field_name
+        # Registers this sensor reads; their pages are polled while it is enabled
+        self._fields = (field_name,)
         # Generate a unique_id based on the field name
-        self._attr_unique_id = f"neore_{field_name}"
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_{field_name}"
+        self._publisher = None
+        self._stale = False
 
     @property
     def name(self):
@@ -70,271 +342,279 @@ class NeoreBaseSensor(SensorEntity):
         return self._attr_unique_id
 
     @property
-    def unit_of_measurement(self):
-        """Return the unit of measurement."""
-        return None  # Default to None if not defined in subclass
+    def should_poll(self):
+        """Entities are pushed to by the coordinator."""
+        return False
+
+    @property
+    def extra_state_attributes(self):
+        """Flag a state restored from the previous run until it is fetched again."""
+        data = self.coordinator.data
+        if data is None or not data.stale:
+            return None
+        return {"stale": True, "data_age": round(time.time() - data.updated_at)}
+
+    async def async_added_to_hass(self):
+        """Subscribe to our registers and pick up the snapshot that is already available."""
+        await super().async_added_to_hass()
+        self._publisher = self.coordinator.create_publisher(self.unique_id, self._deadband)
+        for field in self._fields:
+            self.async_on_remove(self.coordinator.async_subscribe(field, self._endpoint))
+        if self.coordinator.data is not None:
+            # Counts as the first write: Home Assistant writes the state on add
+            self._state = self._compute_state(self.coordinator.data)
+            self._stale = self.coordinator.data.stale
+            self._publisher.should_publish(self._state, self.available)
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Take the new snapshot and write the state if it moved enough."""
+        data = self.coordinator.data
+        if data is None:
+            # Nothing fetched yet; this is a failed first poll
+            super()._handle_coordinator_update()
+            return
+        state = self._compute_state(data)
+        stale = data.stale
+        # A restored value that is confirmed live is written to clear the stale flag
+        if not self._publisher.should_publish(state, self.available) and stale == self._stale:
+            return
+        self._state = state
+        self._stale = stale
+        super()._handle_coordinator_update()
+
+    def _compute_state(self, data):
+        """Return the sensor state for the given snapshot."""
+        return data.get(self._field_name)
 
-    async def async_update(self):
-        """Update the sensor state."""
-        self._state = self._data_manager.get_sensor_data(self._field_name)
 
+### Calculated sensors for monitoring efficiency
 
-### PAGE70.XML
+class NeoreDerivedSensor(NeoreBaseSensor):
+    """Sensor showing a metric of DERIVED_METRICS, described by a table entry.
 
-class NeoreObjectTemperature(NeoreBaseSensor): # __R7195_REAL_.1f
-    @property
-    def unit_of_measurement(self):
-        return "°C"
-    
-    @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 1
+    The value is calculated by the data manager once per snapshot; the
+    sensor subscribes the registers it is calculated from.
+    """
 
-class NeoreOutdoorTemperature(NeoreBaseSensor): # __R7079_REAL_.1f
-    @property
-    def unit_of_measurement(self):
-        return "°C"
-    
-    @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 1
+    entity_description: "NeoreSensorEntityDescription"
 
-class NeoreCirculationPercent(NeoreBaseSensor): # __R15173_REAL_.0f
-    @property
-    def unit_of_measurement(self):
-        return "%"
-    
-    @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 0
+    def __init__(self, coordinator, description):
+        super().__init__(description.name, coordinator, description.endpoint, description.register)
+        self.entity_description = description
+        self._deadband = description.deadband
+        self._fields = coordinator.data_manager.derived.registers_for(description.register)
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_{description.key}"
 
-class NeoreOutdoorUnitCirculationPercent(NeoreBaseSensor): # __R7070_REAL_.0f
-    @property
-    def unit_of_measurement(self):
-        return "%"
-    
-    @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 0
 
-class NeoreOutputTemperature(NeoreBaseSensor): # __R15104_REAL_.1f
-    @property
-    def unit_of_measurement(self):
-        return "°C"
-    
-    @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 1
+### Rolling statistics, computed in memory without recorder queries
 
-class NeoreInputTemperature(NeoreBaseSensor): # __R7096_REAL_.1f
-    @property
-    def unit_of_measurement(self):
-        return "°C"
-    
-    @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 1
+class NeoreRollingSensor(NeoreBaseSensor):
+    """Rolling mean, min, max or time-weighted mean of a register."""
+
+    def __init__(self, name, coordinator, endpoint, field_name, window_seconds, statistic, unit, precision):
+        super().__init__(name, coordinator, endpoint, field_name)
+        self._window_seconds = window_seconds
+        self._statistic = statistic
+        self._unit = unit
+        self._precision = precision
+        self._window = None
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_{field_name}_{statistic}_{window_seconds}"
 
-class NeoreRequiredTemperature(NeoreBaseSensor): # __R7312_REAL_.0f
-    @property
-    def unit_of_measurement(self):
-        return "°C"
-    
     @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 1
+    def native_unit_of_measurement(self):
+        return self._unit
 
-class NeoreWaterFlow(NeoreBaseSensor): # __R7083_REAL_.1f
     @property
-    def unit_of_measurement(self):
-        return "m³/h"
-    
+    def state_class(self):
+        """Return the state class of the sensor."""
+        return SensorStateClass.MEASUREMENT
+
     @property
     def suggested_display_precision(self):
         """Return the suggested display precision."""
-        return 2
+        return self._precision
+
+    async def async_added_to_hass(self):
+        """Start keeping the rolling window for our register."""
+        data_manager = self.coordinator.data_manager
+        self._window = data_manager.track(self._field_name, self._window_seconds, self._endpoint)
+        self.async_on_remove(lambda: data_manager.untrack(self._field_name, self._window_seconds))
+        await super().async_added_to_hass()
+
+    def _compute_state(self, data):
+        """Return the statistic over the window."""
+        value = getattr(self._window, self._statistic)
+        return None if value is None else round(value, self._precision)
+
+
+class NeoreRollingCOP(NeoreBaseSensor):
+    """COP over a rolling window: average thermal power over average electrical power."""
+
+    _deadband = Deadband(relative=0.01)
+
+    def __init__(self, name, coordinator, endpoint, window_seconds):
+        super().__init__(name, coordinator, endpoint, POWER_FIELD)
+        self._window_seconds = window_seconds
+        self._fields = coordinator.data_manager.derived.registers_for("cop")
+        self._thermal = None
+        self._power = None
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_cop_{window_seconds}"
 
-class NeoreActualPowerUsage(NeoreBaseSensor): # __R7087_REAL_.1f
-    @property
-    def unit_of_measurement(self):
-        return "kW"
-    
-    @property
-    def device_class(self):
-        """Return the device class."""
-        return SensorDeviceClass.POWER
-    
     @property
     def state_class(self):
         """Return the state class of the sensor."""
         return SensorStateClass.MEASUREMENT
-    
+
     @property
     def suggested_display_precision(self):
         """Return the suggested display precision."""
         return 2
 
-class NeoreSuppliedPower(NeoreBaseSensor): # __R7091_REAL_.0f
-    @property
-    def unit_of_measurement(self):
-        return "kWh"
+    async def async_added_to_hass(self):
+        """Start keeping rolling windows of thermal and electrical power."""
+        data_manager = self.coordinator.data_manager
+        window = self._window_seconds
+        self._thermal = data_manager.track("thermal_power", window, self._endpoint)
+        self._power = data_manager.track(POWER_FIELD, window, self._endpoint)
+
+        def _untrack():
+            data_manager.untrack("thermal_power", window)
+            data_manager.untrack(POWER_FIELD, window)
+
+        self.async_on_remove(_untrack)
+        await super().async_added_to_hass()
+
+    def _compute_state(self, data):
+        """Calculate the COP from the time-weighted averages."""
+        thermal = self._thermal.time_weighted_mean
+        power = self._power.time_weighted_mean
+        if thermal is None or power is None or power <= 0:
+            return None
+        return round(thermal / power, 2)
+
+
+### Energy integrated in process
+
+class NeoreEnergySensor(NeoreBaseSensor):
+    """Energy in kWh integrated from a power value on every snapshot.
+
+    The running total is persisted by the coordinator and continues across
+    restarts.
+    """
+
+    _deadband = Deadband(absolute=0.01)
+
+    def __init__(self, name, coordinator, endpoint, key, source):
+        super().__init__(name, coordinator, endpoint, source)
+        self._key = key
+        self._source = source
+        derived = coordinator.data_manager.derived
+        self._fields = derived.registers_for(source) if source in derived else (source,)
+        self._integrator = None
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_{key}_energy"
 
     @property
-    def state_class(self):
-        """Return the state class of the sensor."""
-        return SensorStateClass.TOTAL_INCREASING
+    def native_unit_of_measurement(self):
+        return "kWh"
 
     @property
     def device_class(self):
         """Return the class of this device."""
         return SensorDeviceClass.ENERGY
-    
-    @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 1
 
-class NeoreWaterPressure(NeoreBaseSensor): # __R7297_REAL_.1f
     @property
-    def unit_of_measurement(self):
-        return "Bar"
-    
+    def state_class(self):
+        """Return the state class of the sensor."""
+        return SensorStateClass.TOTAL_INCREASING
+
     @property
     def suggested_display_precision(self):
         """Return the suggested display precision."""
-        return 1
+        return 2
 
+    async def async_added_to_hass(self):
+        """Start integrating our power value."""
+        self._integrator = self.coordinator.data_manager.integrate(self._key, self._endpoint, self._source)
+        await super().async_added_to_hass()
 
-### Calculated sensors for monitoring efficiency
+    def _compute_state(self, data):
+        """Return the energy total."""
+        return round(self._integrator.total, 3)
+
+
+class NeoreSCOP(NeoreBaseSensor):
+    """Cumulative SCOP: all thermal energy produced over all electrical energy used."""
+
+    _deadband = Deadband(absolute=0.01)
+
+    def __init__(self, name, coordinator, endpoint):
+        super().__init__(name, coordinator, endpoint, POWER_FIELD)
+        self._fields = coordinator.data_manager.derived.registers_for("cop")
+        self._thermal = None
+        self._electrical = None
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_scop"
 
-class NeoreTemperatureDelta(SensorEntity):
-    """Sensor for temperature difference between output and input."""
-    
-    def __init__(self, name, data_manager, endpoint, output_field, input_field):
-        self._name = name
-        self._state = None
-        self._data_manager = data_manager
-        self._endpoint = endpoint
-        self._output_field = output_field
-        self._input_field = input_field
-        self._attr_unique_id = "neore_temperature_delta"
-    
-    @property
-    def name(self):
-        return self._name
-    
-    @property
-    def state(self):
-        return self._state
-    
-    @property
-    def unique_id(self):
-        """Return a unique ID for this sensor."""
-        return self._attr_unique_id
-    
-    @property
-    def unit_of_measurement(self):
-        return "°C"
-    
     @property
     def state_class(self):
         """Return the state class of the sensor."""
         return SensorStateClass.MEASUREMENT
-    
+
     @property
     def suggested_display_precision(self):
         """Return the suggested display precision."""
-        return 1
-    
-    async def async_update(self):
-        """Calculate temperature delta."""
-        try:
-            output_temp = self._data_manager.get_sensor_data(self._output_field)
-            input_temp = self._data_manager.get_sensor_data(self._input_field)
-            
-            if output_temp is not None and input_temp is not None:
-                self._state = round(float(output_temp) - float(input_temp), 1)
-            else:
-                self._state = None
-        except (ValueError, TypeError):
-            self._state = None
-
-
-class NeoreCOP(SensorEntity):
-    """Sensor for Coefficient of Performance calculation."""
-    
-    def __init__(self, name, data_manager, endpoint, flow_field, output_field, input_field, power_field):
-        self._name = name
-        self._state = None
-        self._data_manager = data_manager
-        self._endpoint = endpoint
-        self._flow_field = flow_field
-        self._output_field = output_field
-        self._input_field = input_field
-        self._power_field = power_field
-        self._attr_unique_id = "neore_cop"
-    
-    @property
-    def name(self):
-        return self._name
-    
-    @property
-    def state(self):
-        return self._state
-    
-    @property
-    def unique_id(self):
-        """Return a unique ID for this sensor."""
-        return self._attr_unique_id
-    
-    @property
-    def unit_of_measurement(self):
-        return None
-    
+        return 2
+
+    async def async_added_to_hass(self):
+        """Share the energy integrators of the energy sensors."""
+        data_manager = self.coordinator.data_manager
+        self._thermal = data_manager.integrate("thermal", self._endpoint, "thermal_power")
+        self._electrical = data_manager.integrate("electrical", self._endpoint, POWER_FIELD)
+        await super().async_added_to_hass()
+
+    def _compute_state(self, data):
+        """Calculate the SCOP from the energy totals."""
+        if self._electrical.total <= 0:
+            return None
+        return round(self._thermal.total / self._electrical.total, 2)
+
+
+### Registers shown as-is, described by REGISTER_SENSORS
+
+class NeoreRegisterSensor(NeoreBaseSensor):
+    """Sensor showing a single PLC register, described by a table entry."""
+
+    entity_description: "NeoreSensorEntityDescription"
+
+    def __init__(self, coordinator, description):
+        super().__init__(description.name, coordinator, description.endpoint, description.register)
+        self.entity_description = description
+        self._deadband = description.deadband
+
+
+### Poll loop diagnostics, described by DIAGNOSTIC_SENSORS
+
+class NeoreDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Sensor showing how the poll loop performs, updated after every attempt."""
+
+    entity_description: NeoreDiagnosticEntityDescription
+
+    def __init__(self, coordinator, description):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_name = f"{coordinator.device_name} {description.name}"
+        self._attr_unique_id = f"{coordinator.unique_id_prefix}_{description.key}"
+
+    async def async_added_to_hass(self):
+        """Also update after the failed polls the coordinator does not push."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self.coordinator.async_add_failure_listener(self.async_write_ha_state))
+
     @property
-    def state_class(self):
-        """Return the state class of the sensor."""
-        return SensorStateClass.MEASUREMENT
-    
+    def available(self):
+        """Stay available while the PLC fails; that is when these matter most."""
+        return True
+
     @property
-    def suggested_display_precision(self):
-        """Return the suggested display precision."""
-        return 2
-    
-    async def async_update(self):
-        """Calculate COP (Coefficient of Performance)."""
-        try:
-            flow = self._data_manager.get_sensor_data(self._flow_field)
-            output_temp = self._data_manager.get_sensor_data(self._output_field)
-            input_temp = self._data_manager.get_sensor_data(self._input_field)
-            power = self._data_manager.get_sensor_data(self._power_field)
-            
-            if all(v is not None for v in [flow, output_temp, input_temp, power]):
-                flow_val = float(flow)
-                temp_diff = float(output_temp) - float(input_temp)
-                power_val = float(power)
-                
-                # Avoid division by zero
-                if power_val > 0 and temp_diff > 0:
-                    # Thermal power (kW) = flow (m³/h) × temp_diff (°C) × 4.186 (kJ/kg·°C) × density (≈1000 kg/m³) / 3600 (s/h)
-                    thermal_power = flow_val * temp_diff * 4.186 * 1000 / 3600
-                    cop = thermal_power / power_val
-                    self._state = round(cop, 2)
-                else:
-                    self._state = None
-            else:
-                self._state = None
-        except (ValueError, TypeError, ZeroDivisionError):
-            self._state = None
-
-
-### PAGE69.XML
-# class NeoreHoursInUse(NeoreBaseSensor): # __R15676_UDINT_u
-#     pass  # No additional implementation needed, uses the base class logic
\ No newline at end of file
+    def native_value(self):
+        return self.entity_description.value_fn(self.coordinator)
@@ -0,0 +1,252 @@
+"""Local stand-in for a Neore SoftPLC, for development and benchmarks.
+
+Implements the protocol as authentication.py uses it: ``GET LOGIN.XML``
+hands out a challenge cookie, ``POST LOGIN.XML`` checks
+SHA-1(challenge + password) and returns a session cookie, and the pages
+list their registers as INPUT elements. Run it on its own with::
+
+    python -m custom_components.neore.simulator --port 8080
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import random
+import secrets
+import time
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+# The registers the integration reads, with plausible values
+DEFAULT_REGISTERS = {
+    'PAGE70.XML': {
+        '__R7195_REAL_.1f': 21.5,
+        '__R7079_REAL_.0f': 5.0,
+        '__R15173_REAL_.0f': 50.0,
+        '__R7070_REAL_.0f': 40.0,
+        '__R15104_REAL_.1f': 35.0,
+        '__R7096_REAL_.1f': 30.0,
+        '__R7312_REAL_.0f': 22.0,
+        '__R7083_REAL_.1f': 1.2,
+        '__R7087_REAL_.1f': 1.5,
+        '__R7091_REAL_.0f': 1234.0,
+        '__R7297_REAL_.1f': 1.8,
+    },
+    'PAGE69.XML': {
+        '__R15676_UDINT_u': 4242,
+    },
+}
+# Total INPUT elements per page, like the real pages; the rest is filler
+DEFAULT_PAGE_SIZES = {'PAGE70.XML': 250, 'PAGE69.XML': 200}
+# Same sliding lifetime the integration assumes
+SESSION_LIFETIME = 600
+
+
+def _render_value(name, value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        fmt = name.rsplit('_', 1)[-1]
+        return format(value, fmt) if fmt.startswith('.') else repr(value)
+    return str(value)
+
+
+class SimulatedPLC:
+    """An aiohttp server that behaves like the SoftPLC web interface.
+
+    ``registers`` maps page names to ``{register name: value}``; values can
+    be changed while the server runs. Every page is padded with filler
+    registers up to its size in ``page_sizes``. ``latency`` delays every
+    response, ``error_rate`` makes that fraction of page requests fail with
+    HTTP 500, and sessions expire ``session_lifetime`` seconds after their
+    last use, after which pages redirect to the login page. With ``etag``,
+    pages carry an ETag and conditional requests can get a 304. A form
+    POST to a page sets its registers, except the ones in ``read_only``.
+    """
+
+    def __init__(
+        self,
+        username='admin',
+        password='password',
+        registers=None,
+        page_sizes=None,
+        latency=0.0,
+        error_rate=0.0,
+        session_lifetime=SESSION_LIFETIME,
+        etag=False,
+        read_only=(),
+        seed=None,
+    ):
+        self.username = username
+        self.password = password
+        self.registers = {page: dict(values) for page, values in (registers or DEFAULT_REGISTERS).items()}
+        self.page_sizes = {**DEFAULT_PAGE_SIZES, **(page_sizes or {})}
+        for page in self.registers:
+            self.page_sizes.setdefault(page, 0)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.session_lifetime = session_lifetime
+        self.etag = etag
+        self.read_only = frozenset(read_only)
+        self._random = random.Random(seed)
+        self._challenges = set()
+        self._sessions = {}  # session cookie -> monotonic expiry
+        self._fail_next = 0
+        self._runner = None
+        self.url = None
+        self.stats = {
+            'logins': 0, 'failed_logins': 0, 'page_requests': 0, 'rejected': 0, 'errors': 0,
+            'not_modified': 0, 'writes': 0, 'bytes_sent': 0,
+        }
+
+        self.app = web.Application()
+        self.app.router.add_get('/LOGIN.XML', self._handle_login_get)
+        self.app.router.add_post('/LOGIN.XML', self._handle_login_post)
+        self.app.router.add_get('/{page}', self._handle_page)
+        self.app.router.add_post('/{page}', self._handle_page)
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start serving and return the base URL, with a trailing slash."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}/"
+        _LOGGER.debug("Simulated SoftPLC listening on %s", self.url)
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def expire_sessions(self):
+        """Drop every session, as a PLC reboot would."""
+        self._sessions.clear()
+
+    def fail_next(self, count=1):
+        """Make the next ``count`` page requests fail with HTTP 500."""
+        self._fail_next += count
+
+    def render_page(self, page):
+        """Return the XML body of a page."""
+        values = self.registers.get(page, {})
+        inputs = [f'<INPUT NAME="{name}" VALUE="{_render_value(name, value)}"/>' for name, value in values.items()]
+        # Filler addresses stay clear of the real ones and of other pages
+        base = 20000 + 10000 * sorted(self.page_sizes).index(page)
+        for i in range(self.page_sizes.get(page, 0) - len(values)):
+            inputs.append(f'<INPUT NAME="__R{base + i}_REAL_.1f" VALUE="{i % 100}.{i % 10}"/>')
+        return f'<?xml version="1.0" encoding="ISO-8859-1"?><PAGE>{"".join(inputs)}</PAGE>'.encode('latin1')
+
+    def _write(self, page, form):
+        values = self.registers.get(page, {})
+        for name, raw in form.items():
+            if name not in values or name in self.read_only:
+                continue
+            current = values[name]
+            try:
+                values[name] = float(raw) if isinstance(current, float) else int(float(raw))
+            except ValueError:
+                continue
+            self.stats['writes'] += 1
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _handle_login_get(self, request):
+        await self._delay()
+        challenge = secrets.token_hex(8).upper()
+        self._challenges.add(challenge)
+        response = web.Response(text='<LOGIN/>', content_type='text/xml')
+        response.set_cookie('SoftPLC', challenge)
+        return response
+
+    async def _handle_login_post(self, request):
+        await self._delay()
+        data = await request.post()
+        challenge = request.cookies.get('SoftPLC')
+        expected = hashlib.sha1(f"{challenge}{self.password}".encode('latin1')).hexdigest()
+        if challenge not in self._challenges or data.get('USER') != self.username or data.get('PASS') != expected:
+            self.stats['failed_logins'] += 1
+            return web.Response(status=403, text='<LOGIN/>', content_type='text/xml')
+        self._challenges.discard(challenge)
+        session = secrets.token_hex(8).upper()
+        self._sessions[session] = time.monotonic() + self.session_lifetime
+        self.stats['logins'] += 1
+        response = web.Response(text='<OK/>', content_type='text/xml')
+        response.set_cookie('SoftPLC', session)
+        return response
+
+    async def _handle_page(self, request):
+        await self._delay()
+        self.stats['page_requests'] += 1
+        session = request.cookies.get('SoftPLC')
+        now = time.monotonic()
+        if self._sessions.get(session, 0) <= now:
+            self._sessions.pop(session, None)
+            self.stats['rejected'] += 1
+            raise web.HTTPFound('/LOGIN.XML')
+        self._sessions[session] = now + self.session_lifetime
+
+        if self._fail_next or (self.error_rate and self._random.random() < self.error_rate):
+            self._fail_next = max(0, self._fail_next - 1)
+            self.stats['errors'] += 1
+            return web.Response(status=500, text='Internal error')
+
+        page = request.match_info['page']
+        if page not in self.page_sizes:
+            return web.Response(status=404)
+        if request.method == 'POST':
+            self._write(page, await request.post())
+        body = self.render_page(page)
+        headers = {}
+        if self.etag:
+            headers['ETag'] = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            if request.headers.get('If-None-Match') == headers['ETag']:
+                self.stats['not_modified'] += 1
+                return web.Response(status=304, headers=headers)
+        self.stats['bytes_sent'] += len(body)
+        return web.Response(body=body, headers=headers, content_type='text/xml', charset='ISO-8859-1')
+
+
+async def _serve(args):
+    plc = SimulatedPLC(
+        args.username,
+        args.password,
+        page_sizes={page: args.registers for page in DEFAULT_PAGE_SIZES},
+        latency=args.latency,
+        error_rate=args.error_rate,
+        session_lifetime=args.session_lifetime,
+        etag=args.etag,
+    )
+    url = await plc.start(args.host, args.port)
+    print(f"Simulated SoftPLC listening on {url} (user {args.username!r}, password {args.password!r})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await plc.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated Neore SoftPLC")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--registers", type=int, default=250, help="INPUT elements per page")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of page requests failing with 500")
+    parser.add_argument("--session-lifetime", type=float, default=SESSION_LIFETIME)
+    parser.add_argument("--etag", action="store_true", help="send ETags and answer conditional requests")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Make the integration importable as ``custom_components.neore``.
+
+Only the package path is registered, so the Home Assistant free modules
+can be tested without running the integration's ``__init__``. Tests
+written as ``async def`` run on a fresh event loop each.
+"""
+import asyncio
+import contextlib
+import inspect
+import pathlib
+import sys
+import types
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def _register_package():
+    if 'custom_components.neore' in sys.modules:
+        return
+    namespace = sys.modules.setdefault('custom_components', types.ModuleType('custom_components'))
+    namespace.__path__ = getattr(namespace, '__path__', [])
+    package = types.ModuleType('custom_components.neore')
+    package.__path__ = [str(ROOT)]
+    sys.modules['custom_components.neore'] = package
+    namespace.neore = package
+
+
+_register_package()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**arguments))
+    return True
+
+
+@pytest.fixture
+def simulated_plc():
+    """Return an async context manager serving a SimulatedPLC and a session to it.
+
+    Keyword arguments go to SimulatedPLC; it yields ``(plc, session)``.
+    """
+    from custom_components.neore.authentication import create_session
+    from custom_components.neore.simulator import SimulatedPLC
+
+    @contextlib.asynccontextmanager
+    async def serve(**options):
+        plc = SimulatedPLC(**options)
+        await plc.start()
+        session = create_session()
+        try:
+            yield plc, session
+        finally:
+            await session.close()
+            await plc.stop()
+
+    return serve
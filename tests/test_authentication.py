@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from custom_components.neore.authentication import (
+    SHA1_BACKENDS,
+    NeoreSessionManager,
+    SHA1_KNOWN_ANSWERS,
+    _sha1_hashlib,
+    _sha1_python,
+    select_sha1_backend,
+    verify_sha1_backend,
+)
+
+# Digests of the original NeoreSessionManager.sha1_hash, covering the
+# lengths around the padding boundaries and latin-1 characters
+BASELINE_DIGESTS = (
+    ("a", "86f7e437faa5a7fce15d1ddcb9eaeaea377667b8"),
+    ("The quick brown fox jumps over the lazy dog", "2fd4e1c67a2d28fced849ee1bb76e7391b93eb12"),
+    ("x" * 55, "cef734ba81a024479e09eb5a75b6ddae62e6abf1"),
+    ("x" * 56, "901305367c259952f4e7af8323f480d59f81335b"),
+    ("x" * 63, "0ddc4e0cccd9a12850deb5abb0853a4425559fec"),
+    ("x" * 64, "bb2fa3ee7afb9f54c6dfb5d021f14b1ffe40c163"),
+    ("x" * 65, "78c741ddc482e4cdf8c474a0876347a0905b6233"),
+    ("y" * 119, "25929d08d28168361a95aa00ff2996fc221af2aa"),
+    ("y" * 128, "0520052435ef008389a96b2bf28bb38347319ffb"),
+    ("0123456789ABCDEF" + "ÿé£" * 10, "57bc8c59a77d4b63c5913815342aa0c716f714e6"),
+    ("chal123pw", "71dd32e77b0cf3ebd05b5adaea823c3727a610f2"),
+    ("z" * 1000, "3bbf093cf7107deb323bced4c13c347cc87e482a"),
+)
+
+BACKENDS = pytest.mark.parametrize('backend', [_sha1_hashlib, _sha1_python], ids=['hashlib', 'python'])
+
+
+@BACKENDS
+@pytest.mark.parametrize('message, digest', SHA1_KNOWN_ANSWERS)
+def test_known_answers(backend, message, digest):
+    assert backend(message) == digest
+
+
+@BACKENDS
+@pytest.mark.parametrize('message, digest', BASELINE_DIGESTS)
+def test_matches_baseline_digests(backend, message, digest):
+    assert backend(message) == digest
+
+
+def test_every_backend_is_verified():
+    assert all(verify_sha1_backend(backend) for backend in SHA1_BACKENDS.values())
+
+
+def test_broken_backend_is_rejected():
+    assert not verify_sha1_backend(lambda message: _sha1_hashlib(message + "x"))
+
+
+def test_select_falls_back_to_a_verified_backend():
+    assert select_sha1_backend('python') == 'python'
+    assert select_sha1_backend('missing') == 'hashlib'
+
+
+async def test_one_login_for_concurrent_requests(simulated_plc):
+    async with simulated_plc() as (plc, session):
+        manager = NeoreSessionManager(plc.url, plc.username, plc.password, session)
+        await asyncio.gather(*(manager.async_get('PAGE70.XML') for _ in range(5)))
+        assert plc.stats['logins'] == 1
+        assert manager.login_count == 1
+
+
+async def test_one_login_per_expiry_for_concurrent_requests(simulated_plc):
+    async with simulated_plc(session_lifetime=0.2) as (plc, session):
+        manager = NeoreSessionManager(plc.url, plc.username, plc.password, session)
+        await manager.async_get('PAGE70.XML')
+        for expiry in range(2):
+            # The PLC forgets the session while the manager still trusts its cookie
+            await asyncio.sleep(0.3)
+            pages = await asyncio.gather(*(manager.async_get('PAGE70.XML') for _ in range(5)))
+            assert all(page.startswith(b'<?xml') for page in pages)
+            assert plc.stats['logins'] == 2 + expiry
+        assert plc.stats['rejected'] >= 2
+        assert plc.stats['failed_logins'] == 0
+        assert manager.login_count == 3
@@ -0,0 +1,38 @@
+from custom_components.neore.authentication import SHA1_BACKEND
+from custom_components.neore.benchmark import (
+    BUDGETS,
+    bench_login,
+    bench_login_hash,
+    bench_parse,
+    bench_poll_cycles,
+    check_budgets,
+)
+
+
+async def test_hot_paths_are_within_budget():
+    parse, stats = bench_parse(iterations=20)
+    _, (poll_cycle, _, _), _ = await bench_poll_cycles(cycles=5)
+    login, _, _ = await bench_login(iterations=10)
+    measurements = {
+        'login_hash_us': bench_login_hash(200)[SHA1_BACKEND],
+        'selective_parse_us': parse['selective'][0],
+        'selective_parse_peak_kib': parse['selective'][1],
+        'login_round_trip_ms': login,
+        'poll_cycle_ms': poll_cycle,
+    }
+    assert measurements.keys() == BUDGETS.keys()
+    assert check_budgets(measurements) == []
+    # The selective parse stops early and keeps only the wanted registers
+    assert stats.kept == 13
+    assert stats.scanned < 500
+    assert parse['selective'][1] < parse['full tree'][1]
+
+
+def test_overrun_is_reported():
+    measurements = {'poll_cycle_ms': 80.0, 'login_hash_us': 1.0, 'unknown': 1e9}
+    overruns = check_budgets(measurements, {'poll_cycle_ms': 50, 'login_hash_us': 25})
+    assert overruns == ['poll_cycle_ms is 80.00, over its budget of 50']
+
+
+def test_missing_measurement_is_not_an_overrun():
+    assert check_budgets({'login_hash_us': None}) == []
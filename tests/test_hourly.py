@@ -0,0 +1,45 @@
+import pytest
+
+from custom_components.neore.hourly import HourlyAggregator, HourSummary
+
+
+def test_hour_is_completed_by_a_sample_of_a_later_hour():
+    aggregator = HourlyAggregator()
+    aggregator.add(10.0, 3300)
+    aggregator.add(20.0, 3450)
+    assert aggregator.take() == []
+    aggregator.add(30.0, 3650)
+    assert aggregator.take() == [HourSummary(0, 15.0, 10.0, 20.0, 20.0)]
+    assert aggregator.take() == []
+
+
+def test_value_carries_over_into_the_next_hour():
+    aggregator = HourlyAggregator()
+    for value, timestamp in ((10.0, 3300), (20.0, 3450), (30.0, 3650), (30.0, 3800), (0.0, 7200)):
+        aggregator.add(value, timestamp)
+    first, second = aggregator.take()
+    assert first.start == 0
+    assert second.start == 3600
+    # 20 held from the start of the hour until 3650, then 30 until 3800
+    assert second.mean == pytest.approx((20 * 50 + 30 * 150) / 200)
+    assert (second.min, second.max, second.last) == (20.0, 30.0, 30.0)
+
+
+def test_value_is_not_held_across_a_gap():
+    aggregator = HourlyAggregator(max_gap=300)
+    for value, timestamp in ((10.0, 0), (10.0, 100), (50.0, 1000), (50.0, 1100), (0.0, 3600)):
+        aggregator.add(value, timestamp)
+    (summary,) = aggregator.take()
+    # Only 0-100 s at 10 and 1000-1100 s at 50 count
+    assert summary.mean == pytest.approx(30.0)
+    assert (summary.min, summary.max, summary.last) == (10.0, 50.0, 50.0)
+
+
+def test_missing_and_repeated_samples_are_ignored():
+    aggregator = HourlyAggregator()
+    aggregator.add(10.0, 0)
+    aggregator.add(None, 100)
+    aggregator.add(99.0, 0)
+    aggregator.add(10.0, 200)
+    aggregator.add(10.0, 3600)
+    assert aggregator.take() == [HourSummary(0, 10.0, 10.0, 10.0, 10.0)]
@@ -0,0 +1,41 @@
+from xml.parsers import expat
+
+import pytest
+
+from custom_components.neore.page_parser import ParseStats, extract_registers
+
+
+def build_page(names):
+    inputs = ''.join(f'<INPUT NAME="{name}" VALUE="{index}.5"/>' for index, name in enumerate(names))
+    return f'<?xml version="1.0" encoding="ISO-8859-1"?><PAGE>{inputs}</PAGE>'.encode('latin1')
+
+
+NAMES = [f'__R{7000 + i}_REAL_.1f' for i in range(100)]
+PAGE = build_page(NAMES)
+
+
+def test_stops_once_every_wanted_register_is_seen():
+    values, stats = extract_registers(PAGE, frozenset(NAMES[:3]))
+    assert values == {NAMES[0]: '0.5', NAMES[1]: '1.5', NAMES[2]: '2.5'}
+    assert stats == ParseStats(scanned=3, kept=3, complete=True)
+
+
+def test_scans_the_whole_page_for_a_missing_register():
+    values, stats = extract_registers(PAGE, frozenset([NAMES[50], '__R1_REAL_.1f']))
+    assert values == {NAMES[50]: '50.5'}
+    assert stats == ParseStats(scanned=100, kept=1, complete=False)
+
+
+def test_keeps_every_register_without_a_wanted_set():
+    values, stats = extract_registers(PAGE)
+    assert len(values) == 100
+    assert stats == ParseStats(scanned=100, kept=100, complete=False)
+
+
+def test_nothing_wanted_parses_nothing():
+    assert extract_registers(PAGE, frozenset()) == ({}, ParseStats(0, 0, True))
+
+
+def test_malformed_page_raises():
+    with pytest.raises(expat.ExpatError):
+        extract_registers(b'<PAGE><INPUT NAME="x"', frozenset(['y']))
@@ -0,0 +1,97 @@
+import contextlib
+
+import pytest
+
+from custom_components.neore.archive import SnapshotArchive, read_archive
+from custom_components.neore.authentication import NeoreError
+from custom_components.neore.plc_data_manager import NeoreDataManager
+from custom_components.neore.simulator import DEFAULT_REGISTERS
+
+PAGE = 'PAGE70.XML'
+INDOOR = '__R7195_REAL_.1f'
+FLOW = '__R7087_REAL_.1f'
+
+
+@pytest.fixture
+def polling(simulated_plc):
+    """Return an async context manager yielding ``(plc, manager)``; every page is due on every cycle."""
+
+    @contextlib.asynccontextmanager
+    async def serve(archive=None, **options):
+        async with simulated_plc(**options) as (plc, session):
+            manager = NeoreDataManager(
+                session, plc.url, plc.username, plc.password, dict.fromkeys(DEFAULT_REGISTERS, 0), archive
+            )
+            try:
+                yield plc, manager
+            finally:
+                await manager.async_close()
+
+    return serve
+
+
+async def test_identical_page_is_not_parsed_again(polling):
+    async with polling() as (plc, manager):
+        manager.subscribe(INDOOR, PAGE)
+        first = await manager.async_update()
+        second = await manager.async_update()
+        assert manager.metrics.unchanged == {'not_modified': 0, 'identical': 1}
+        assert not manager.last_cycle_changed
+        assert second.get(INDOOR) == 21.5
+        # Unchanged values are still stamped with the cycle that confirmed them
+        assert second.reading(INDOOR).fetched_at > first.reading(INDOOR).fetched_at
+
+        plc.registers[PAGE][INDOOR] = 22.5
+        third = await manager.async_update()
+        assert third.get(INDOOR) == 22.5
+        assert manager.last_cycle_changed
+        assert manager.metrics.unchanged['identical'] == 1
+
+
+async def test_not_modified_page_is_not_parsed_again(polling):
+    async with polling(etag=True) as (plc, manager):
+        manager.subscribe(INDOOR, PAGE)
+        first = await manager.async_update()
+        second = await manager.async_update()
+        assert plc.stats['not_modified'] == 1
+        assert manager.metrics.unchanged == {'not_modified': 1, 'identical': 0}
+        assert second.get(INDOOR) == 21.5
+        assert second.reading(INDOOR).fetched_at > first.reading(INDOOR).fetched_at
+
+
+@pytest.mark.parametrize('archived', [False, True], ids=['selective', 'archived'])
+async def test_register_subscribed_later_is_published(polling, tmp_path, archived):
+    archive = SnapshotArchive(str(tmp_path)) if archived else None
+    async with polling(archive, etag=True) as (plc, manager):
+        manager.subscribe(INDOOR, PAGE)
+        await manager.async_update()
+        assert manager.subscribe(FLOW, PAGE)
+        snapshot = await manager.async_update()
+        assert snapshot.get(FLOW) == 1.5
+        assert snapshot.get(INDOOR) == 21.5
+        # From then on the page is revalidated again
+        await manager.async_update()
+        assert plc.stats['not_modified'] == 1
+    if archived:
+        archive.flush()
+        records = list(read_archive(str(tmp_path)))
+        assert len(records) == 2
+        assert records[-1][1][FLOW] == 1.5
+
+
+async def test_failing_page_does_not_fail_the_others(polling):
+    async with polling() as (plc, manager):
+        manager.subscribe(INDOOR, PAGE)
+        # Not served by the simulator, so it answers 404
+        manager.subscribe('__R1_REAL_.1f', 'PAGE1.XML')
+        snapshot = await manager.async_update()
+        assert snapshot.get(INDOOR) == 21.5
+        assert manager.scheduler.failures('PAGE1.XML') == 1
+        assert manager.scheduler.failures(PAGE) == 0
+
+
+async def test_every_page_failing_raises(polling):
+    async with polling() as (plc, manager):
+        manager.subscribe('__R1_REAL_.1f', 'PAGE1.XML')
+        with pytest.raises(NeoreError):
+            await manager.async_update()
@@ -0,0 +1,59 @@
+import pytest
+
+from custom_components.neore.rolling import RollingWindow
+
+
+def test_statistics_over_the_window():
+    window = RollingWindow(10, 100)
+    for value, timestamp in ((1.0, 0), (3.0, 5), (2.0, 10)):
+        window.add(value, timestamp)
+    assert len(window) == 3
+    assert window.mean == pytest.approx(2.0)
+    assert (window.min, window.max, window.last) == (1.0, 3.0, 2.0)
+    assert window.span == 10
+    # 1 held for 5 s, then 3 held for 5 s
+    assert window.time_weighted_mean == pytest.approx(2.0)
+
+
+def test_samples_older_than_the_window_are_dropped():
+    window = RollingWindow(10, 100)
+    for value, timestamp in ((1.0, 0), (3.0, 5), (2.0, 10), (5.0, 15)):
+        window.add(value, timestamp)
+    assert len(window) == 3
+    assert window.mean == pytest.approx(10 / 3)
+    assert (window.min, window.max) == (2.0, 5.0)
+    assert window.time_weighted_mean == pytest.approx(2.5)
+
+
+def test_full_buffer_drops_the_oldest_sample():
+    window = RollingWindow(100, 3)
+    for value, timestamp in ((0.0, 0), (9.0, 1), (4.0, 2), (6.0, 3)):
+        window.add(value, timestamp)
+    assert len(window) == 3
+    assert (window.min, window.max) == (4.0, 9.0)
+    assert window.mean == pytest.approx(19 / 3)
+
+
+def test_missing_and_out_of_order_samples_are_ignored():
+    window = RollingWindow(10, 10)
+    window.add(1.0, 5)
+    window.add(None, 6)
+    window.add(float('nan'), 7)
+    window.add(8.0, 4)
+    assert len(window) == 1
+    assert window.time_weighted_mean == 1.0
+
+
+def test_statistics_stay_exact_over_many_laps():
+    window = RollingWindow(1000, 7)
+    for step in range(10000):
+        window.add(0.1 * (step % 3), step)
+    values = [0.1 * (step % 3) for step in range(9993, 10000)]
+    assert window.mean == pytest.approx(sum(values) / 7, abs=1e-12)
+    assert window.min == min(values)
+    assert window.max == max(values)
+
+
+def test_empty_window_has_no_statistics():
+    window = RollingWindow(10, 10)
+    assert (window.mean, window.min, window.max, window.last, window.time_weighted_mean) == (None,) * 5
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+from custom_components.neore.scheduler import (
+    FAST_FACTOR,
+    MAX_BACKOFF,
+    MIN_REFRESH_SPACING,
+    SLOW_FACTOR,
+    PollScheduler,
+    backoff_delay,
+)
+
+FAST_PAGE = 'PAGE70.XML'
+SLOW_PAGE = 'PAGE69.XML'
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = PollScheduler({FAST_PAGE: 10, SLOW_PAGE: 600}, 30)
+    assert scheduler.subscribe('__R7195_REAL_.1f', FAST_PAGE)
+    assert scheduler.subscribe('__R15676_UDINT_u', SLOW_PAGE)
+    return scheduler
+
+
+def test_new_pages_are_due_at_once(scheduler):
+    assert sorted(scheduler.due_pages()) == [SLOW_PAGE, FAST_PAGE]
+
+
+def test_each_page_runs_on_its_own_interval(scheduler):
+    now = time.monotonic()
+    for page in scheduler.pages:
+        scheduler.mark_polled(page, now)
+    assert scheduler.due_pages(now + 9.9) == []
+    assert scheduler.due_pages(now + 10) == [FAST_PAGE]
+    assert sorted(scheduler.due_pages(now + 600)) == [SLOW_PAGE, FAST_PAGE]
+    assert scheduler.next_due_in(now) == pytest.approx(10)
+
+
+def test_subscribing_a_known_register_does_not_make_the_page_due(scheduler):
+    now = time.monotonic()
+    scheduler.mark_polled(FAST_PAGE, now)
+    assert not scheduler.subscribe('__R7195_REAL_.1f', FAST_PAGE)
+    assert not scheduler.subscribe('__R7079_REAL_.0f', FAST_PAGE, fetch=False)
+    assert scheduler.subscribe('__R7083_REAL_.1f', FAST_PAGE)
+    assert FAST_PAGE in scheduler.due_pages()
+
+
+def test_page_stops_once_unsubscribed(scheduler):
+    scheduler.unsubscribe('__R15676_UDINT_u', SLOW_PAGE)
+    assert scheduler.pages == (FAST_PAGE,)
+    assert scheduler.wanted(SLOW_PAGE) == frozenset()
+
+
+def test_interval_adapts_to_activity(scheduler):
+    for _ in range(10):
+        scheduler.record_activity(FAST_PAGE, True)
+    assert scheduler.interval(FAST_PAGE) == pytest.approx(10 * FAST_FACTOR)
+    for _ in range(20):
+        scheduler.record_activity(FAST_PAGE, False)
+    assert scheduler.interval(FAST_PAGE) == pytest.approx(10 * SLOW_FACTOR)
+
+
+@pytest.mark.parametrize('failures', range(1, 12))
+def test_backoff_doubles_up_to_the_maximum(failures):
+    delay = min(MAX_BACKOFF, 30 * 2 ** (failures - 1))
+    for _ in range(50):
+        assert delay / 2 <= backoff_delay(failures, 30) <= delay
+
+
+def test_failed_page_backs_off_alone(scheduler):
+    now = time.monotonic()
+    for page in scheduler.pages:
+        scheduler.mark_polled(page, now)
+    assert scheduler.mark_failed(FAST_PAGE, now) == 1
+    assert scheduler.mark_failed(FAST_PAGE, now) == 2
+    assert scheduler.failures(FAST_PAGE) == 2
+    # Second failure of a page on a 10 s interval: 10 to 20 s
+    assert 10 <= scheduler.next_due_in(now) <= 20
+    assert FAST_PAGE not in scheduler.due_pages(now + 9.9)
+    assert SLOW_PAGE not in scheduler.due_pages(now + 20)
+    scheduler.mark_polled(FAST_PAGE, now + 20)
+    assert scheduler.failures(FAST_PAGE) == 0
+    assert scheduler.failures(SLOW_PAGE) == 0
+
+
+def test_backoff_starts_from_the_default_interval_on_slow_pages(scheduler):
+    now = time.monotonic()
+    scheduler.unsubscribe('__R7195_REAL_.1f', FAST_PAGE)
+    scheduler.mark_polled(SLOW_PAGE, now)
+    scheduler.mark_failed(SLOW_PAGE, now)
+    assert 15 <= scheduler.next_due_in(now) <= 30
+
+
+def test_refresh_request_respects_the_minimum_spacing(scheduler):
+    now = time.monotonic()
+    scheduler.mark_polled(SLOW_PAGE, now)
+    assert scheduler.request(SLOW_PAGE, now + 1) == pytest.approx(MIN_REFRESH_SPACING - 1)
+    assert scheduler.request(SLOW_PAGE, now + MIN_REFRESH_SPACING) == 0
+    assert scheduler.request('PAGE1.XML', now) is None
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from custom_components.neore.authentication import NeoreError, NeoreSessionManager
+from custom_components.neore.plc_data_manager import NeoreDataManager
+from custom_components.neore.writer import WriteQueue
+
+PAGE = 'PAGE70.XML'
+SETPOINT = '__R7312_REAL_.0f'
+INDOOR = '__R7195_REAL_.1f'
+
+
+def write_queue(plc, session):
+    return WriteQueue(NeoreSessionManager(plc.url, plc.username, plc.password, session), delay=0.05)
+
+
+async def test_writes_at_the_same_time_share_one_post(simulated_plc):
+    async with simulated_plc() as (plc, session):
+        queue = write_queue(plc, session)
+        first, second = await asyncio.gather(
+            queue.async_write(PAGE, SETPOINT, 24), queue.async_write(PAGE, INDOOR, 19.5)
+        )
+        # One POST and one read back
+        assert plc.stats['page_requests'] == 2
+        assert plc.stats['writes'] == 2
+        assert first == second
+        assert first[SETPOINT].value == 24.0
+        assert first[INDOOR].value == 19.5
+        assert plc.registers[PAGE][SETPOINT] == 24.0
+
+
+async def test_latest_value_of_a_register_wins(simulated_plc):
+    async with simulated_plc() as (plc, session):
+        queue = write_queue(plc, session)
+        results = await asyncio.gather(
+            queue.async_write(PAGE, SETPOINT, 23), queue.async_write(PAGE, SETPOINT, 25)
+        )
+        assert [readings[SETPOINT].value for readings in results] == [25.0, 25.0]
+        assert plc.stats['writes'] == 1
+
+
+async def test_later_writes_start_a_new_batch(simulated_plc):
+    async with simulated_plc() as (plc, session):
+        queue = write_queue(plc, session)
+        await queue.async_write(PAGE, SETPOINT, 23)
+        await queue.async_write(PAGE, SETPOINT, 24)
+        assert plc.stats['page_requests'] == 4
+        assert plc.registers[PAGE][SETPOINT] == 24.0
+
+
+async def test_value_not_taken_by_the_plc_fails_only_its_caller(simulated_plc):
+    async with simulated_plc(read_only=[INDOOR]) as (plc, session):
+        queue = write_queue(plc, session)
+        accepted, refused = await asyncio.gather(
+            queue.async_write(PAGE, SETPOINT, 24), queue.async_write(PAGE, INDOOR, 30.0), return_exceptions=True
+        )
+        assert accepted[SETPOINT].value == 24.0
+        assert isinstance(refused, NeoreError)
+        assert plc.registers[PAGE][INDOOR] == 21.5
+
+
+async def test_written_value_is_published_and_polled(simulated_plc):
+    async with simulated_plc(etag=True) as (plc, session):
+        manager = NeoreDataManager(session, plc.url, plc.username, plc.password, {PAGE: 0})
+        try:
+            manager.subscribe(SETPOINT, PAGE)
+            await manager.async_update()
+            snapshot = await manager.async_write(SETPOINT, PAGE, 25)
+            assert snapshot.get(SETPOINT) == 25.0
+            assert manager.last_cycle_changed
+            # The next poll reads the page in full, not a stale revalidation
+            plc.registers[PAGE][SETPOINT] = 26.0
+            snapshot = await manager.async_update()
+            assert snapshot.get(SETPOINT) == 26.0
+        finally:
+            await manager.async_close()
+
+
+async def test_closing_fails_pending_writes(simulated_plc):
+    async with simulated_plc() as (plc, session):
+        queue = write_queue(plc, session)
+        write = asyncio.ensure_future(queue.async_write(PAGE, SETPOINT, 24))
+        await asyncio.sleep(0)
+        await queue.async_close()
+        with pytest.raises(NeoreError):
+            await write
+        assert plc.stats['writes'] == 0
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from xml.parsers import expat
+from .authentication import NeoreError
+from .page_parser import extract_registers
+from .registers import RegisterValue, decode_value, encode_value
+
+_LOGGER = logging.getLogger(__name__)
+
+# Writes to the same page within this many seconds go out as one POST
+WRITE_COALESCE_DELAY = 0.5
+
+
+class WriteQueue:
+    """Set register values on the PLC, batched per page and confirmed by reading back.
+
+    Writes that arrive within WRITE_COALESCE_DELAY of the first pending one
+    on a page are sent as a single form POST, the latest value of each
+    register winning. The page is then read again. Every caller gets the
+    readings of the batch, or a NeoreError if the PLC did not take the
+    value of the caller's register.
+    """
+
+    def __init__(self, session_manager, delay=WRITE_COALESCE_DELAY):
+        self._session_manager = session_manager
+        self._delay = delay
+        self._pending = {}  # page -> {register: value}
+        self._waiters = {}  # page -> (register, future) of the callers waiting for the batch
+        self._flushes = {}  # page -> task that sends the batch
+        self._tasks = set()  # every batch not finished yet, for async_close()
+        # One batch at a time, so batches reach the PLC in order
+        self._lock = asyncio.Lock()
+
+    async def async_write(self, page, register, value):
+        """Queue a write; return the confirmed readings once its batch is written."""
+        self._pending.setdefault(page, {})[register] = value
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(page, []).append((register, future))
+        if page not in self._flushes:
+            task = self._flushes[page] = asyncio.ensure_future(self._async_flush(page))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await future
+
+    async def async_close(self):
+        """Cancel the batches not written yet; their callers get a NeoreError."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # A batch cancelled before it started never got to fail its callers
+        for page, waiters in self._waiters.items():
+            for _, waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(NeoreError(f"Write to {page} was cancelled"))
+        self._pending.clear()
+        self._waiters.clear()
+        self._flushes.clear()
+
+    async def _async_flush(self, page):
+        # Callers joining while the batch waits are added to this same list
+        waiters = self._waiters[page]
+        try:
+            await asyncio.sleep(self._delay)
+            # Writes from here on start the next batch
+            del self._flushes[page]
+            values = self._pending.pop(page)
+            del self._waiters[page]
+            try:
+                async with self._lock:
+                    readings, errors = await self._async_write_and_confirm(page, values)
+            except Exception as err:  # every caller has to hear about it, whatever it is
+                readings, errors = None, dict.fromkeys(values, err)
+        except asyncio.CancelledError:
+            if self._flushes.get(page) is asyncio.current_task():
+                # Cancelled while waiting, before the batch was taken
+                del self._flushes[page]
+                del self._pending[page]
+                del self._waiters[page]
+            for _, waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(NeoreError(f"Write to {page} was cancelled"))
+            raise
+        for register, waiter in waiters:
+            if waiter.done():
+                continue
+            if register in errors:
+                waiter.set_exception(errors[register])
+            else:
+                waiter.set_result(readings)
+
+    async def _async_write_and_confirm(self, page, values):
+        form = {name: encode_value(name, value) for name, value in values.items()}
+        _LOGGER.debug("Writing %s to %s", form, page)
+        await self._session_manager.async_post(page, form)
+
+        # Read back only the written registers to confirm them. A plain GET
+        # leaves the validators of the poll's last parse alone
+        content = await self._session_manager.async_get(page)
+        try:
+            raw, _ = extract_registers(content, frozenset(values))
+        except expat.ExpatError as e:
+            raise NeoreError(f"Invalid XML received from endpoint {page}: {e}") from e
+        fetched_at = time.time()
+        readings = {name: RegisterValue(decode_value(name, raw.get(name)), fetched_at) for name in values}
+        errors = {
+            name: NeoreError(f"PLC did not accept {name}={form[name]}, it reads {raw.get(name)}")
+            for name, reading in readings.items()
+            if reading.value is None or encode_value(name, reading.value) != form[name]
+        }
+        return readings, errors